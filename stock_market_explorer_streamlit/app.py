@@ -1,27 +1,114 @@
 import streamlit as st
 import pandas as pd
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-from elastic_api import search_index, semantic_search
-from stock_utils import get_stock_price_data, get_market_index, get_today_market_ranking, get_stock_volume_rank
+from chart_data import build_correlation_figure, build_index_figure, build_stock_figure, points_for_width
+from elastic_api import close_search_session, keyword_page, open_search_session, semantic_page
+from stock_utils import get_today_market_ranking
+from detail_loader import index_market_for, start_detail_load, submit_index, submit_price, submit_ranking, wait_result
+from intraday_store import INTRADAY_REFRESH
+from model_loader import MODEL_WARMUP, get_model_status, start_warm_up
+from theme_index import build_theme_index
+import metrics
 
 st.set_page_config(page_title="주식 탐색 스캐너", page_icon="📈", layout="wide")
 
+# wide 레이아웃에서 좌측(6)/우측(4) 영역 차트의 대략적인 폭(px)
+LEFT_CHART_WIDTH = 1100
+RIGHT_CHART_WIDTH = 700
+
+INDEX_NAME = "stock_info"
+KEYWORD_MODE = "키워드 검색 (정확도 우선)"
+SEMANTIC_MODE = "의미 기반 통합검색 (문맥 우선)"
+ITEMS_PER_PAGE = 12
+THEME_WEIGHTINGS = {"동일 가중": 'equal', "거래대금 가중": 'volume'}
+
+@st.cache_resource
+def warm_up_embedding_model():
+    """프로세스당 한 번만 백그라운드 모델 로드를 시작합니다. (스크립트 재실행/다른 세션에서는 재사용)"""
+    return start_warm_up()
+
+# 첫 화면은 모델 없이 바로 그리고, 의미 기반 검색 전에 모델이 준비되도록 뒤에서 로드
+if MODEL_WARMUP:
+    warm_up_embedding_model()
+
+@st.cache_resource
+def start_metrics_exporters():
+    """METRICS_PORT/METRICS_FILE 설정에 따른 Prometheus 노출을 프로세스당 한 번만 시작합니다."""
+    metrics.start_exporters()
+
+start_metrics_exporters()
+
 if 'search_results' not in st.session_state:
     st.session_state.search_results = []
 if 'selected_company' not in st.session_state:
     st.session_state.selected_company = None
 if 'page_number' not in st.session_state:
     st.session_state.page_number = 0 
+# 페이지 단위 검색 상태: 검색 조건, 전체 건수, 키워드 검색의 페이지별 커서(search_after)와 PIT ID
+if 'search_request' not in st.session_state:
+    st.session_state.search_request = None
+if 'total_results' not in st.session_state:
+    st.session_state.total_results = 0
+if 'search_cursors' not in st.session_state:
+    st.session_state.search_cursors = {}
+if 'search_pit' not in st.session_state:
+    st.session_state.search_pit = None
+# 의미 기반 검색 결과로 만든 테마 지수 (검색할 때마다 초기화)
+if 'theme_index' not in st.session_state:
+    st.session_state.theme_index = None
+
+def render_price_chart(ticker, market, timeframe, simplify_chart, price_future=None):
+    """주가 차트 영역. price_future가 없으면 (자동 갱신 시) 새로 조회를 요청합니다."""
+    try:
+        with metrics.timer('render.wait_price'):
+            price_df = wait_result(price_future or submit_price(ticker, timeframe, market))
+
+        if not price_df.empty:
+            # 이동평균선(MA5/20/60)은 get_stock_price_data가 주기별로 미리 계산하여 함께 반환
+            # 색상/툴팁은 벡터 연산으로 만들고, 봉이 화면 폭보다 많으면 구간 집계로 줄여서 그림
+            max_points = points_for_width(LEFT_CHART_WIDTH) if simplify_chart else None
+            with metrics.timer('render.stock_chart'):
+                fig_stock = build_stock_figure(price_df, timeframe, max_points=max_points)
+                st.plotly_chart(fig_stock, use_container_width=True)
+            if timeframe == '분봉':
+                st.caption(f"마지막 봉: {price_df.index[-1].strftime('%Y-%m-%d %H:%M')}")
+        else:
+            st.warning("선택한 주기에 해당하는 주가 데이터가 없습니다.")
+
+    except Exception as e:
+        st.error(f"데이터를 불러오지 못했습니다. (사유: {e})")
+
+# 분봉 자동 갱신: 이 영역만 주기적으로 다시 실행되며, 저장소는 마지막 봉 이후의 새 봉만 받아 옴
+live_price_chart = st.fragment(run_every=INTRADAY_REFRESH)(render_price_chart)
+
+def load_search_page(page):
+    """현재 검색 조건의 page 번째 페이지만 elastic_api에서 받아 세션에 보관합니다."""
+    request = st.session_state.search_request
+    if request["mode"] == KEYWORD_MODE:
+        # 첫 페이지만 보고 끝나는 검색이 대부분이므로 PIT는 다음 페이지로 넘어갈 때 처음 엶
+        if page > 0 and st.session_state.search_pit is None:
+            st.session_state.search_pit = open_search_session(INDEX_NAME)
+        result = keyword_page(INDEX_NAME, request["field"], request["query"], ITEMS_PER_PAGE,
+                              search_after=st.session_state.search_cursors.get(page),
+                              pit_id=st.session_state.search_pit)
+        st.session_state.search_pit = result["pit_id"]
+        st.session_state.search_cursors[page + 1] = result["search_after"]
+    else:
+        result = semantic_page(INDEX_NAME, request["query"], page, ITEMS_PER_PAGE, max_results=50)
+    st.session_state.page_number = page
+    st.session_state.search_results = result["hits"]
+    st.session_state.total_results = result["total"]
 
 st.title("주식 탐색 스캐너")
 
+# 우측 랭킹 패널용 시장 데이터는 화면을 그리는 동안 백그라운드에서 미리 조회
+submit_ranking()
+
 # 상단 검색 영역
 # 🌟 상단 검색 모드 선택
 st.markdown("### 종목 및 테마 검색")
-search_mode = st.radio("검색 모드 선택", ["키워드 검색 (정확도 우선)", "의미 기반 통합검색 (문맥 우선)"], horizontal=True)
+search_mode = st.radio("검색 모드 선택", [KEYWORD_MODE, SEMANTIC_MODE], horizontal=True)
 
-if search_mode == "키워드 검색 (정확도 우선)":
+if search_mode == KEYWORD_MODE:
     search_field = st.radio("검색 기준", ["회사명", "종목코드", "업종", "주요제품"], horizontal=True)
     st.info("💡 키워드 기반으로 입력해보세요!")
     placeholder_text = "예: 삼성전자"
@@ -39,15 +126,15 @@ with col_search2:
 if search_btn and search_query:
     with st.spinner("데이터를 조회 중입니다..."):
         st.session_state.selected_company = None 
-        st.session_state.page_number = 0 
         
-        # 🌟 모드에 따른 검색 로직 분기
-        if search_mode == "📌 키워드 검색 (정확도 우선)":
-            result = search_index("stock_info", search_field, search_query, 100)
-            st.session_state.search_results = result.to_dict()["hits"]["hits"]
-        else:
-            result = semantic_search("stock_info", search_query, 50)
-            st.session_state.search_results = result["hits"]["hits"] # kNN 응답 구조에 맞게 파싱
+        # 🌟 모드에 따른 검색 로직 분기 (첫 페이지만 조회, 이후 페이지는 이동할 때 조회)
+        close_search_session(st.session_state.search_pit)
+        st.session_state.search_request = {"mode": search_mode, "field": search_field, "query": search_query}
+        st.session_state.search_cursors = {}
+        st.session_state.theme_index = None
+        st.session_state.search_pit = None
+        with metrics.timer('render.search'):
+            load_search_page(0)
             
     if not st.session_state.search_results:
         st.warning("⚠️ 일치하는 검색 결과가 없습니다.")
@@ -62,20 +149,15 @@ col_left, col_right = st.columns([6, 4], gap="large")
 # ==========================================
 with col_left:
     if st.session_state.search_results:
-        st.markdown("### 검색 결과")
+        st.markdown(f"### 검색 결과 ({st.session_state.total_results:,}건)")
         result_list = [hit["_source"] for hit in st.session_state.search_results]
         df_results = pd.DataFrame(result_list)
         display_cols = ['회사명', '종목코드', '시장구분', '업종', '주요제품', '상장일']
         display_cols = [col for col in display_cols if col in df_results.columns]
         st.dataframe(df_results[display_cols], hide_index=True, use_container_width=True, height=200)
 
-        items_per_page = 12 
-        total_results = len(st.session_state.search_results)
-        total_pages = (total_results - 1) // items_per_page + 1
-
-        start_idx = st.session_state.page_number * items_per_page
-        end_idx = start_idx + items_per_page
-        current_page_results = st.session_state.search_results[start_idx:end_idx]
+        total_pages = max((st.session_state.total_results - 1) // ITEMS_PER_PAGE + 1, 1)
+        current_page_results = st.session_state.search_results
 
         st.markdown("<br>", unsafe_allow_html=True)
         st.markdown("주가를 확인할 기업을 선택해주세요.")
@@ -91,15 +173,57 @@ with col_left:
         page_col1, page_col2, page_col3 = st.columns([1, 2, 1])
         with page_col1:
             if st.button("← 이전", disabled=(st.session_state.page_number == 0), use_container_width=True):
-                st.session_state.page_number -= 1
+                load_search_page(st.session_state.page_number - 1)
                 st.rerun()
         with page_col2:
             st.markdown(f"<div style='text-align: center; padding-top: 5px;'><b>페이지 {st.session_state.page_number + 1} / {total_pages}</b></div>", unsafe_allow_html=True)
         with page_col3:
-            if st.button("다음 →", disabled=(st.session_state.page_number == total_pages - 1), use_container_width=True):
-                st.session_state.page_number += 1
+            if st.button("다음 →", disabled=(st.session_state.page_number >= total_pages - 1), use_container_width=True):
+                load_search_page(st.session_state.page_number + 1)
                 st.rerun()
 
+        # 🌟 의미 기반 검색 결과 전체를 하나의 테마로 묶어 지수/수익률/상관관계를 한 번에 확인
+        request = st.session_state.search_request
+        if request and request["mode"] == SEMANTIC_MODE:
+            with st.expander("📊 테마 지수 (검색 결과 전체를 하나의 지수로 보기)"):
+                theme_col1, theme_col2, theme_col3 = st.columns([2, 2, 1])
+                with theme_col1:
+                    theme_weighting = st.radio("가중 방식", list(THEME_WEIGHTINGS), horizontal=True)
+                with theme_col2:
+                    theme_size = st.slider("구성 종목 수 (유사도 상위)", 10, 200, 50, step=10)
+                with theme_col3:
+                    theme_btn = st.button("테마 지수 계산", use_container_width=True)
+
+                if theme_btn:
+                    with st.spinner("구성 종목의 일봉을 동시에 조회하는 중입니다..."):
+                        try:
+                            # 목록 표시용 필드 없이 종목코드/회사명만 받아 옴
+                            members = semantic_page(INDEX_NAME, request["query"], 0, theme_size, max_results=theme_size,
+                                                    source_fields=["회사명", "종목코드"])["hits"]
+                            names = {hit["_source"]["종목코드"]: hit["_source"].get("회사명", "") for hit in members}
+                            with metrics.timer('render.theme_index'):
+                                st.session_state.theme_index = build_theme_index(list(names), names=names,
+                                                                                 weighting=THEME_WEIGHTINGS[theme_weighting])
+                        except Exception as e:
+                            st.session_state.theme_index = None
+                            st.error(f"테마 지수를 계산하지 못했습니다. (사유: {e})")
+
+                theme = st.session_state.theme_index
+                if theme is not None:
+                    if len(theme) == 0:
+                        st.warning("구성 종목의 주가 데이터를 불러오지 못했습니다.")
+                    else:
+                        last_value = theme.values[-1]
+                        st.metric(f"'{request['query']}' 테마 지수 ({len(theme)}종목)", f"{last_value:,.2f}",
+                                  f"{last_value - 100:+.2f}% (1년)")
+                        st.plotly_chart(build_index_figure(theme.index_frame(), max_points=points_for_width(LEFT_CHART_WIDTH)),
+                                        use_container_width=True)
+                        st.dataframe(theme.constituents_frame(), hide_index=True, use_container_width=True, height=250)
+                        st.markdown("**일간 수익률 상관계수**")
+                        st.plotly_chart(build_correlation_figure(theme.correlation, theme.labels()), use_container_width=True)
+                        if theme.errors:
+                            st.caption(f"⚠️ {len(theme.errors)}개 종목은 시세를 불러오지 못해 제외되었습니다.")
+
     if st.session_state.selected_company:
         company_data = st.session_state.selected_company
         corp_name = company_data.get("회사명", "알 수 없음")
@@ -111,55 +235,27 @@ with col_left:
 
         # 차트 주기 선택 라디오 버튼 (디폴트: 월봉 -> index=0)
         timeframe = st.radio("차트 주기", ["월봉", "주봉", "일봉", "분봉"], index=0, horizontal=True)
-        
-        try:
-            price_df = get_stock_price_data(ticker, timeframe=timeframe, market=market)
-            
-            if not price_df.empty:
-                # 이동평균선 계산
-                price_df['MA5'] = price_df['Close'].rolling(window=5).mean()
-                price_df['MA20'] = price_df['Close'].rolling(window=20).mean()
-                price_df['MA60'] = price_df['Close'].rolling(window=60).mean()
-                
-                # 거래량 상승/하락 색상 (전일 대비 혹은 시가/종가 대비)
-                colors = ['red' if row['Close'] >= row['Open'] else 'blue' for _, row in price_df.iterrows()]
+        simplify_chart = st.checkbox("대용량 차트 간소화 (화면 폭에 맞춰 데이터 점 개수 축소)", value=True)
+        live_refresh = timeframe == '분봉' and st.checkbox(f"실시간 자동 갱신 ({INTRADAY_REFRESH}초마다 새 분봉 반영)", value=False)
 
-                # 서브플롯 생성 (위: 캔들스틱+이평선, 아래: 거래량)
-                fig_stock = make_subplots(rows=2, cols=1, shared_xaxes=True, 
-                                          vertical_spacing=0.03, row_heights=[0.7, 0.3])
-                
-                hover_text = [
-                    f"날짜: {idx.strftime('%Y-%m-%d %H:%M') if timeframe == '분봉' else idx.strftime('%Y년 %m월 %d일')}<br>시가: {row['Open']:,.0f}원<br>고가: {row['High']:,.0f}원<br>저가: {row['Low']:,.0f}원<br>종가: {row['Close']:,.0f}원<br>거래량: {row['Volume']:,.0f}주"
-                    for idx, row in price_df.iterrows()
-                ]
-
-                # 1. 캔들스틱 추가
-                fig_stock.add_trace(go.Candlestick(
-                    x=price_df.index, open=price_df['Open'], high=price_df['High'],
-                    low=price_df['Low'], close=price_df['Close'],
-                    name="주가", increasing_line_color='red', decreasing_line_color='blue',
-                    text=hover_text, hoverinfo='text'
-                ), row=1, col=1)
-                
-                # 2. 이동평균선 추가
-                fig_stock.add_trace(go.Scatter(x=price_df.index, y=price_df['MA5'], name='5선', line=dict(color='orange', width=1.5)), row=1, col=1)
-                fig_stock.add_trace(go.Scatter(x=price_df.index, y=price_df['MA20'], name='20선', line=dict(color='purple', width=1.5)), row=1, col=1)
-                fig_stock.add_trace(go.Scatter(x=price_df.index, y=price_df['MA60'], name='60선', line=dict(color='green', width=1.5)), row=1, col=1)
-
-                # 3. 거래량 바 차트 추가
-                fig_stock.add_trace(go.Bar(x=price_df.index, y=price_df['Volume'], name='거래량', marker_color=colors), row=2, col=1)
-
-                fig_stock.update_layout(height=500, margin=dict(l=20, r=20, t=20, b=20), xaxis_rangeslider_visible=False, showlegend=True)
-                
-                date_format = "%Y-%m-%d %H:%M" if timeframe == '분봉' else "%Y-%m-%d"
-                fig_stock.update_xaxes(tickformat=date_format)
-                
-                st.plotly_chart(fig_stock, use_container_width=True)
-            else:
-                st.warning("선택한 주기에 해당하는 주가 데이터가 없습니다.")
+        # 🌟 주가/시장 지수/거래량 순위를 동시에 조회 시작 (나머지 차트 주기는 백그라운드에서 미리 조회)
+        # 첫 차트까지 걸리는 시간 = 가장 느린 단일 호출 시간
+        detail_futures = start_detail_load(company_data, timeframe)
+        # 거래량 순위는 자리만 잡아 두고 차트를 먼저 그린 뒤 채움
+        rank_slot = st.empty()
+        
+        if live_refresh:
+            # 재실행될 때마다 새로 조회하도록 Future를 넘기지 않음 (진행 중인 같은 요청은 detail_loader가 합쳐 줌)
+            live_price_chart(ticker, market, timeframe, simplify_chart)
+        else:
+            render_price_chart(ticker, market, timeframe, simplify_chart, detail_futures['price'])
 
-        except Exception as e:
-            st.error(f"데이터를 불러오지 못했습니다. (사유: {e})")
+        try:
+            volume_rank, total_count = wait_result(detail_futures['rank'])
+            if volume_rank:
+                rank_slot.caption(f"오늘 거래량 순위: {volume_rank:,}위 / {total_count:,}종목")
+        except Exception:
+            rank_slot.caption("거래량 순위를 불러오지 못했습니다.")
 
 # ==========================================
 # 우측 영역: 시장 랭킹 및 시장 지수 차트
@@ -173,7 +269,8 @@ with col_right:
         return get_today_market_ranking()
 
     try:
-        top_vol, top_gain, top_lose = load_ranking_data()
+        with metrics.timer('render.ranking'):
+            top_vol, top_gain, top_lose = load_ranking_data()
         
         ranking_type = st.radio("랭킹 탭 선택", ["상승률 상위", "하락률 상위", "거래량 상위"], horizontal=True, label_visibility="collapsed")
         
@@ -199,33 +296,22 @@ with col_right:
         company_market = st.session_state.selected_company.get("시장구분", "코스닥")
         
         # 2. 라디오 버튼의 기본 인덱스 매핑 (코스닥=0, 코넥스=1, 유가=2)
-        default_market_idx = 0 # 기본값 코스닥
-        if "코넥스" in company_market:
-            default_market_idx = 1
-        elif "유가" in company_market or "KOSPI" in company_market.upper() or "코스피" in company_market:
-            default_market_idx = 2
+        market_options = ["코스닥", "코넥스", "유가"]
+        default_market_idx = market_options.index(index_market_for(company_market))
             
         # 3. 계산된 인덱스를 바탕으로 라디오 버튼 렌더링
-        target_market = st.radio("시장 선택", ["코스닥", "코넥스", "유가"], index=default_market_idx, horizontal=True, label_visibility="collapsed")
+        target_market = st.radio("시장 선택", market_options, index=default_market_idx, horizontal=True, label_visibility="collapsed")
         
         try:
-            index_df = get_market_index(target_market)
+            # 기본 시장 지수는 기업 선택 시점에 이미 조회가 시작되어 있음
+            with metrics.timer('render.wait_index'):
+                index_df = wait_result(submit_index(target_market))
             
             if not index_df.empty:
-                hover_text_idx = [
-                    f"날짜: {idx.strftime('%Y년 %m월 %d일')}<br>지수: {row['Close']:,.2f} 포인트"
-                    for idx, row in index_df.iterrows()
-                ]
-                
-                fig_index = go.Figure(data=[go.Scatter(
-                    x=index_df.index, y=index_df['Close'], mode='lines', 
-                    line=dict(color='purple', width=2), name="지수",
-                    text=hover_text_idx, hoverinfo='text'
-                )])
-                fig_index.update_layout(height=300, margin=dict(l=20, r=20, t=20, b=20))
-                fig_index.update_xaxes(tickformat="%Y-%m-%d")
-                
-                st.plotly_chart(fig_index, use_container_width=True)
+                max_points = points_for_width(RIGHT_CHART_WIDTH) if simplify_chart else None
+                with metrics.timer('render.index_chart'):
+                    fig_index = build_index_figure(index_df, max_points=max_points)
+                    st.plotly_chart(fig_index, use_container_width=True)
                 
                 if len(index_df) > 1:
                     prev_date_idx = index_df.index[-2].strftime('%Y년 %m월 %d일')
@@ -234,4 +320,24 @@ with col_right:
                 st.warning(f"{target_market} 시장 데이터를 불러올 수 없습니다.")
                 
         except Exception as e:
-            st.error(f"지수 데이터를 불러오지 못했습니다. (사유: {e})")
\ No newline at end of file
+            st.error(f"지수 데이터를 불러오지 못했습니다. (사유: {e})")
+
+# ==========================================
+# 디버그 사이드바: 단계별 지연/호출 수/캐시 적중률 (METRICS_ENABLED=1 일 때만)
+# ==========================================
+if metrics.is_enabled():
+    with st.sidebar:
+        st.markdown("### 🛠️ 성능 메트릭")
+        if st.checkbox("메트릭 표시", value=False):
+            metric_snapshot = metrics.snapshot()
+            st.caption(f"임베딩 모델: {'준비됨' if get_model_status()['ready'] else '로드 중/미사용'}")
+            if metric_snapshot['stages']:
+                st.dataframe(pd.DataFrame(metric_snapshot['stages']), hide_index=True, use_container_width=True)
+            if metric_snapshot['caches']:
+                st.dataframe(pd.DataFrame(metric_snapshot['caches'])[['name', 'size', 'hits', 'misses', 'coalesced', 'hit_rate']],
+                             hide_index=True, use_container_width=True)
+            if metric_snapshot['counters']:
+                st.dataframe(pd.DataFrame(metric_snapshot['counters']), hide_index=True, use_container_width=True)
+            st.download_button("Prometheus 텍스트 받기", metrics.render_prometheus(), file_name="metrics.prom")
+            if st.button("메트릭 초기화"):
+                metrics.reset()
@@ -0,0 +1,73 @@
+from chart_data import candle_hover_text, decimate_ohlc, points_for_width, volume_colors
+import argparse
+import json
+import time
+import numpy as np
+import pandas as pd
+
+def make_minute_bars(rows, seed=0):
+    """분봉과 같은 형태의 합성 OHLCV (1분 간격)"""
+    rng = np.random.default_rng(seed)
+    close = 70000 + np.cumsum(rng.normal(0, 50, rows))
+    open_ = close + rng.normal(0, 30, rows)
+    high = np.maximum(open_, close) + rng.random(rows) * 50
+    low = np.minimum(open_, close) - rng.random(rows) * 50
+    volume = rng.integers(100, 100000, rows)
+    index = pd.date_range('2026-10-12 09:00', periods=rows, freq='min')
+    return pd.DataFrame({'Open': open_, 'High': high, 'Low': low, 'Close': close, 'Volume': volume}, index=index)
+
+def legacy_prepare(price_df, timeframe='분봉'):
+    """app.py에서 사용하던 기존 방식 (행 단위 파이썬 루프)"""
+    colors = ['red' if row['Close'] >= row['Open'] else 'blue' for _, row in price_df.iterrows()]
+    hover_text = [
+        f"날짜: {idx.strftime('%Y-%m-%d %H:%M') if timeframe == '분봉' else idx.strftime('%Y년 %m월 %d일')}<br>시가: {row['Open']:,.0f}원<br>고가: {row['High']:,.0f}원<br>저가: {row['Low']:,.0f}원<br>종가: {row['Close']:,.0f}원<br>거래량: {row['Volume']:,.0f}주"
+        for idx, row in price_df.iterrows()
+    ]
+    return colors, hover_text
+
+def vectorized_prepare(price_df, max_points=None):
+    if max_points is not None:
+        price_df = decimate_ohlc(price_df, max_points)
+    return volume_colors(price_df), candle_hover_text(price_df, intraday=True)
+
+def best_of(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - t0)
+    return min(timings)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="차트 데이터 준비 마이크로 벤치마크: 기존 iterrows 루프 vs chart_data 벡터 연산 (+ 다운샘플링)")
+    parser.add_argument('--rows', type=int, nargs='+', default=[2730, 27300])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--width', type=int, default=1100, help="다운샘플링 기준 차트 폭(px)")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    max_points = points_for_width(args.width)
+    results = []
+    for rows in args.rows:
+        df = make_minute_bars(rows)
+
+        # 결과가 기존 방식과 같은지 먼저 확인
+        legacy_colors, legacy_text = legacy_prepare(df)
+        colors, text = vectorized_prepare(df)
+        assert list(colors) == legacy_colors and list(text) == legacy_text
+
+        legacy = best_of(lambda: legacy_prepare(df), args.repeat)
+        vectorized = best_of(lambda: vectorized_prepare(df), args.repeat)
+        decimated = best_of(lambda: vectorized_prepare(df, max_points), args.repeat)
+        results.append({
+            'rows': rows,
+            'legacy_ms': round(legacy * 1000, 3),
+            'vectorized_ms': round(vectorized * 1000, 3),
+            'decimated_ms': round(decimated * 1000, 3),
+            'decimated_points': min(rows, max_points),
+            'speedup': round(legacy / vectorized, 1)
+        })
+        print(f"rows={rows:>7}  iterrows {legacy * 1000:9.2f}ms  vectorized {vectorized * 1000:8.2f}ms  "
+              f"+decimate({min(rows, max_points)}) {decimated * 1000:8.2f}ms  x{legacy / vectorized:.1f}")
+    print(json.dumps(results, ensure_ascii=False))
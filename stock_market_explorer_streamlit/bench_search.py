@@ -0,0 +1,411 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from vector_index import DTYPES, LocalVectorIndex, normalize
+import argparse
+import elastic_api
+import json
+import model_loader
+import os
+import platform
+import re
+import sys
+import tempfile
+import time
+import zlib
+import numpy as np
+import pandas as pd
+
+# 실제 KRX 상장법인 수 (get_stock_info() 기준, 1x 규모)
+BASE_LISTINGS = 2700
+INDEX_NAME = 'stock_info'
+
+# 고정 질의 세트: 회사명(키워드 검색용)과 테마 문장(의미 기반 검색용)
+NAME_QUERIES = ["삼성전자", "현대자동차", "카카오", "셀트리온", "에코프로", "한화오션", "SK하이닉스", "LG에너지솔루션"]
+THEME_QUERIES = [
+    "전기차 배터리", "여름철 냉방", "인공지능 소프트웨어", "반도체 장비", "바이오 신약 개발",
+    "조선 해양 플랜트", "게임 콘텐츠", "원자력 발전", "화장품 수출", "방산 무기체계"
+]
+
+INDUSTRIES = [
+    "반도체 제조업", "전자부품 제조업", "소프트웨어 개발 및 공급업", "의약품 제조업", "자동차 부품 제조업",
+    "일차전지 및 축전지 제조업", "기초 화학물질 제조업", "선박 및 보트 건조업", "영상 및 오디오물 제공 서비스업",
+    "전기장비 제조업", "특수 목적용 기계 제조업", "화장품 제조업", "항공기 우주선 및 부품 제조업", "금융 지원 서비스업",
+    "가정용 기기 제조업", "발전 및 송배전업", "게임 소프트웨어 개발 및 공급업", "의료용 기기 제조업"
+]
+PRODUCTS = [
+    "메모리 반도체", "2차전지 양극재", "배터리 분리막", "에어컨", "냉방기", "선풍기", "바이오시밀러", "신약 후보물질",
+    "자율주행 소프트웨어", "인공지능 플랫폼", "클라우드 서비스", "모바일 게임", "온라인 게임", "LNG 운반선",
+    "원자로 부품", "변압기", "화장품", "기초 화장품", "유도무기", "전투기 부품", "웨이퍼 장비", "식각 장비",
+    "진단키트", "임플란트", "드라마 제작", "웹툰"
+]
+MARKETS = ["유가", "코스닥", "코넥스"]
+
+def make_corpus(scale=1, seed=0):
+    """get_stock_info()와 같은 스키마의 합성 상장법인 목록 (BASE_LISTINGS * scale 행)"""
+    rng = np.random.default_rng(seed)
+    n = int(BASE_LISTINGS * scale)
+    names = [NAME_QUERIES[i] if i < len(NAME_QUERIES) else f"테스트기업{i:06d}" for i in range(n)]
+    industries = rng.choice(INDUSTRIES, size=n)
+    products = [", ".join(rng.choice(PRODUCTS, size=rng.integers(1, 4), replace=False)) for _ in range(n)]
+
+    df = pd.DataFrame({
+        '회사명': names,
+        '시장구분': rng.choice(MARKETS, size=n, p=[0.35, 0.6, 0.05]),
+        '종목코드': [f"{i:06d}" for i in range(n)],
+        '업종': industries,
+        '주요제품': products,
+        '상장일': pd.to_datetime(rng.integers(7000, 20000, size=n), unit='D').strftime('%Y-%m-%d'),
+        '결산월': '12월',
+        '대표자명': '홍길동',
+        '홈페이지': None
+    })
+    df['업종_리스트'] = df['업종'].apply(lambda x: x.split() if x else [])
+    df['주요제품_리스트'] = df['주요제품'].apply(lambda x: [item.strip() for item in re.split(r'및|,', x) if item.strip()] if x else [])
+    df['통합텍스트'] = df['회사명'] + " " + df['업종'] + " " + df['주요제품']
+    return df
+
+class HashingEncoder:
+    """
+    네트워크/모델 없이 동작하는 결정적 임베딩 (문자 2-gram 해싱).
+    의미 품질이 아니라 검색 경로의 속도와 recall 비교를 위한 대역입니다.
+    """
+
+    def __init__(self, dims=768):
+        self.dims = dims
+
+    def _buckets(self, text):
+        text = f" {text} "
+        return [zlib.crc32(text[i:i + 2].encode('utf-8')) % self.dims for i in range(len(text) - 1)]
+
+    def encode(self, texts, batch_size=None, **kwargs):
+        single = isinstance(texts, str)
+        texts = [texts] if single else texts
+        matrix = np.zeros((len(texts), self.dims), dtype=np.float32)
+        rows, cols = [], []
+        for row, text in enumerate(texts):
+            buckets = self._buckets(text)
+            rows.extend([row] * len(buckets))
+            cols.extend(buckets)
+        np.add.at(matrix, (np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64)), 1.0)
+        matrix = normalize(matrix)
+        return matrix[0] if single else matrix
+
+class FakeResponse(dict):
+    """elasticsearch 8.x의 ObjectApiResponse 대역 (elasticsearch_dsl은 응답의 .body를 읽음)"""
+
+    @property
+    def body(self):
+        return dict(self)
+
+class FakeElasticsearch:
+    """
+    네트워크 없이 벤치마크를 돌리기 위한 Elasticsearch 클라이언트 대역.
+    elastic_api가 사용하는 search(kNN / match / multi_match, from_/size, search_after, _source)와
+    point-in-time API만 흉내 내며, 응답은 실제 ES와 같은 구조의 딕셔너리입니다.
+    키워드 인자 호출(elastic_api)과 body= 호출(elasticsearch_dsl Search.execute) 모두 받습니다.
+    """
+
+    def __init__(self, sources, vectors, index_name=INDEX_NAME):
+        self.index_name = index_name
+        self.sources = sources
+        self.vector_index = LocalVectorIndex.from_arrays(vectors, [s['종목코드'] for s in sources], sources, index_name=index_name)
+
+    def open_point_in_time(self, index, keep_alive):
+        return {'id': f"pit-{index}"}
+
+    def close_point_in_time(self, id):
+        return {'succeeded': True}
+
+    def _hit(self, row, score, source_fields, sort=None):
+        source = self.sources[row]
+        if source_fields is not None:
+            source = {field: source[field] for field in source_fields if field in source}
+        hit = {'_index': self.index_name, '_id': source['종목코드'], '_score': score, '_source': source}
+        if sort is not None:
+            hit['sort'] = sort
+        return hit
+
+    def _match_scores(self, query):
+        if 'multi_match' in query:
+            text, fields = query['multi_match']['query'], query['multi_match']['fields']
+        else:
+            (field, text), = query['match'].items()
+            fields = [field]
+        tokens = str(text).split()
+        scores = np.zeros(len(self.sources), dtype=np.float64)
+        for row, source in enumerate(self.sources):
+            value = " ".join(str(source.get(field, "")) for field in fields)
+            scores[row] = sum(value.count(token) for token in tokens)
+        return scores
+
+    def search(self, index=None, body=None, knn=None, query=None, size=10, from_=0, _source=None,
+               sort=None, search_after=None, pit=None, track_total_hits=None, **kwargs):
+        body = dict(body or {})
+        knn = knn or body.get('knn')
+        query = query or body.get('query')
+        size = body.get('size', size)
+        from_ = body.get('from', from_)
+        _source = _source if _source is not None else body.get('_source')
+        search_after = search_after or body.get('search_after')
+
+        if knn is not None:
+            return FakeResponse(self.vector_index.search(knn['query_vector'], k=knn['k'], source_fields=_source, from_=from_, size=size))
+
+        scores = self._match_scores(query)
+        matched = np.flatnonzero(scores > 0)
+        # (점수 내림차순, 종목코드 오름차순) 정렬 -- keyword_page와 같은 정렬 기준
+        order = matched[np.lexsort((matched, -scores[matched]))]
+        if search_after:
+            after_score, after_code = float(search_after[0]), int(search_after[1])
+            keep = (scores[order] < after_score) | ((scores[order] == after_score) & (order > after_code))
+            order = order[keep]
+        else:
+            order = order[from_:]
+        # PIT 검색이면 실제 ES처럼 정렬 값 끝에 _shard_doc 값을 붙임
+        tiebreak = (lambda row: [int(row)]) if pit else (lambda row: [])
+        hits = [self._hit(row, float(scores[row]), _source, [float(scores[row]), self.sources[row]['종목코드']] + tiebreak(row))
+                for row in order[:size]]
+        response = FakeResponse(hits={'total': {'value': len(matched), 'relation': 'eq'}, 'max_score': hits[0]['_score'] if hits else None, 'hits': hits})
+        if pit:
+            response['pit_id'] = pit['id']
+        return response
+
+def tie_aware_recall(rows, scores, k):
+    """
+    정확한 코사인 기준 k번째 점수 이상인 결과의 비율.
+    해싱 임베딩은 동점이 많아 집합 비교(recall_at_k)로는 동점 순서 차이까지 누락으로 셉니다.
+    """
+    kth = np.partition(-scores, k - 1)[k - 1] * -1
+    return float(np.mean(scores[np.asarray(rows, dtype=np.int64)] >= kth - 1e-6)) if len(rows) else 0.0
+
+def percentiles(samples_ms):
+    samples = np.asarray(samples_ms, dtype=np.float64)
+    return {
+        'p50': round(float(np.percentile(samples, 50)), 3),
+        'p95': round(float(np.percentile(samples, 95)), 3),
+        'p99': round(float(np.percentile(samples, 99)), 3),
+        'mean': round(float(samples.mean()), 3)
+    }
+
+def timed_calls(func, args_list, repeat, setup=None):
+    samples = []
+    for _ in range(repeat):
+        for args in args_list:
+            if setup is not None:
+                setup()
+            t0 = time.perf_counter()
+            func(*args)
+            samples.append((time.perf_counter() - t0) * 1000)
+    return samples
+
+def throughput(func, args_list, clients, total_calls):
+    """clients개의 동시 클라이언트가 total_calls번 호출할 때의 초당 처리량"""
+    calls = [args_list[i % len(args_list)] for i in range(total_calls)]
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        list(executor.map(lambda args: func(*args), calls))
+    return round(total_calls / (time.perf_counter() - t0), 1)
+
+def use_backend(backend):
+    """elastic_api의 의미 기반 검색 백엔드를 바꾸고 이전 백엔드로 계산된 결과 캐시를 비웁니다."""
+    elastic_api.VECTOR_BACKEND = backend
+    elastic_api.clear_caches()
+
+def result_ids(response):
+    return [hit['_id'] for hit in response['hits']['hits']]
+
+def keyword_pages(query, pages=3, page_size=12):
+    """keyword_page로 앞에서부터 pages 페이지를 넘깁니다. (앱과 같이 두 번째 페이지부터 PIT 사용)"""
+    cursor, pit_id = None, None
+    for page in range(pages):
+        if page > 0 and pit_id is None:
+            pit_id = elastic_api.open_search_session(INDEX_NAME)
+        result = elastic_api.keyword_page(INDEX_NAME, '회사명', query, page_size, search_after=cursor, pit_id=pit_id)
+        pit_id, cursor = result['pit_id'], result['search_after']
+        if cursor is None:
+            break
+    elastic_api.close_search_session(pit_id)
+
+def semantic_pages(query, index_name=INDEX_NAME, pages=3, page_size=12):
+    for page in range(pages):
+        elastic_api.semantic_page(index_name, query, page, page_size, max_results=50)
+
+@contextmanager
+def caches_disabled():
+    """elastic_api의 검색어 벡터/검색 결과 캐시를 잠시 끕니다. (크기 0이면 저장하자마자 내보냄)"""
+    caches = (elastic_api._query_vector_cache, elastic_api._result_cache)
+    sizes = [cache.maxsize for cache in caches]
+    elastic_api.clear_caches()
+    for cache in caches:
+        cache.maxsize = 0
+    try:
+        yield
+    finally:
+        for cache, size in zip(caches, sizes):
+            cache.maxsize = size
+
+def measure(func, call_args, args, setup=elastic_api.clear_caches):
+    """
+    캐시를 비운 매 호출의 지연(search_ms)과 캐시 적중 시 지연(cached_ms), 동시 호출 처리량을 측정합니다.
+    처리량은 캐시를 끈 상태에서 측정하므로 클라이언트 수가 달라도 매 호출이 실제 검색 경로를 거칩니다.
+    """
+    search_ms = percentiles(timed_calls(func, call_args, args.repeat, setup=setup))
+    for call in call_args:
+        func(*call)
+    cached_ms = percentiles(timed_calls(func, call_args, args.repeat))
+    with caches_disabled():
+        throughput_qps = {str(c): throughput(func, call_args, c, args.calls) for c in args.clients}
+    return {
+        'search_ms': search_ms,
+        'cached_ms': cached_ms,
+        'throughput_qps': throughput_qps
+    }
+
+def build_backends(sources, vectors, dtypes, local_dir):
+    """
+    이름 -> (elastic_api.VECTOR_BACKEND 값, 로컬 색인 이름) 딕셔너리.
+    로컬 색인은 dtype별로 local_dir에 저장해 두고 elastic_api가 실제 앱과 같은 경로로 불러오게 합니다.
+    """
+    backends = {'es-standin': ('elasticsearch', INDEX_NAME)}
+    ids = [s['종목코드'] for s in sources]
+    for dtype in dtypes:
+        index_name = f"{INDEX_NAME}-{dtype}"
+        LocalVectorIndex.from_arrays(vectors, ids, sources, dtype=dtype, index_name=INDEX_NAME).save(os.path.join(local_dir, index_name))
+        backends[f'local-{dtype}'] = ('local', index_name)
+    return backends
+
+def run_scale(scale, encoder, args):
+    df = make_corpus(scale, seed=args.seed)
+    sources = json.loads(df.drop(columns=['통합텍스트']).to_json(orient='records'))
+
+    t0 = time.perf_counter()
+    vectors = np.asarray(encoder.encode(df['통합텍스트'].tolist(), batch_size=args.batch_size), dtype=np.float32)
+    corpus_encode_s = time.perf_counter() - t0
+
+    # 질의 임베딩 시간
+    queries = THEME_QUERIES + NAME_QUERIES
+    encode_samples = timed_calls(lambda q: encoder.encode(q), [(q,) for q in queries], args.repeat)
+    query_vectors = [np.asarray(encoder.encode(q), dtype=np.float32) for q in queries]
+
+    # 정답: float32 정규화 행렬에 대한 정확한 코사인 상위 k
+    exact_matrix = normalize(vectors)
+    exact_scores = [exact_matrix @ normalize(v) for v in query_vectors]
+    id_to_row = {s['종목코드']: i for i, s in enumerate(sources)}
+
+    # 앱과 같은 진입점(elastic_api)을 대역 클라이언트/인코더로 실행
+    elastic_api.set_client(FakeElasticsearch(sources, vectors))
+    model_loader._model = encoder
+    results = []
+    with tempfile.TemporaryDirectory() as local_dir:
+        elastic_api.LOCAL_INDEX_DIR = local_dir
+        for name, (backend, index_name) in build_backends(sources, vectors, args.dtypes, local_dir).items():
+            use_backend(backend)
+            search = lambda q, index_name=index_name: elastic_api.semantic_search(index_name, q, max_results=args.k)
+            call_args = [(q,) for q in queries]
+            recalls = []
+            for q, scores in zip(queries, exact_scores):
+                rows = [id_to_row[i] for i in result_ids(search(q))]
+                recalls.append(tie_aware_recall(rows, scores, args.k))
+            results.append(dict({
+                'scale': scale,
+                'rows': len(df),
+                'backend': name,
+                'kind': 'knn',
+                'corpus_encode_s': round(corpus_encode_s, 3),
+                'query_encode_ms': percentiles(encode_samples),
+                f'recall_at_{args.k}': round(float(np.mean(recalls)), 4)
+            }, **measure(search, call_args, args)))
+
+            pages = lambda q, index_name=index_name: semantic_pages(q, index_name)
+            results.append(dict({'scale': scale, 'rows': len(df), 'backend': name, 'kind': 'semantic_page'},
+                                **measure(pages, [(q,) for q in THEME_QUERIES], args)))
+        use_backend('elasticsearch')
+
+    # 회사명 키워드 검색: search_index는 elasticsearch_dsl Search.execute 경로, keyword_page는 search_after 페이지 이동
+    name_args = [(q,) for q in NAME_QUERIES]
+    keyword = lambda q: elastic_api.search_index(INDEX_NAME, '회사명', q, max_results=12)
+    # '테스트기업'은 합성 종목 대부분과 일치하므로 PIT를 연 채 여러 페이지를 넘기는 경로까지 측정
+    page_args = name_args + [("테스트기업",)]
+    for kind, func, call_args in (('keyword', keyword, name_args), ('keyword_page', keyword_pages, page_args)):
+        results.append(dict({'scale': scale, 'rows': len(df), 'backend': 'es-standin', 'kind': kind}, **measure(func, call_args, args)))
+    elastic_api.set_client(None)
+    return results
+
+def compare_with_baseline(results, baseline, max_regression, k):
+    """기준 결과 대비 p95 지연이 max_regression 비율 이상 늘었거나, 처리량이 그 비율 이상 줄었거나, recall이 떨어진 항목 목록"""
+    key = lambda r: (r['scale'], r['backend'], r['kind'])
+    previous = {key(r): r for r in baseline['results']}
+    regressions = []
+    for result in results:
+        before = previous.get(key(result))
+        if before is None:
+            continue
+        if result['search_ms']['p95'] > before['search_ms']['p95'] * (1 + max_regression):
+            regressions.append(f"{key(result)} p95 {before['search_ms']['p95']}ms -> {result['search_ms']['p95']}ms")
+        for clients, qps in result.get('throughput_qps', {}).items():
+            before_qps = before.get('throughput_qps', {}).get(clients)
+            if before_qps and qps < before_qps * (1 - max_regression):
+                regressions.append(f"{key(result)} {clients} clients {before_qps} qps -> {qps} qps")
+        recall_key = f'recall_at_{k}'
+        if recall_key in result and recall_key in before and result[recall_key] < before[recall_key] - 1e-9:
+            regressions.append(f"{key(result)} {recall_key} {before[recall_key]} -> {result[recall_key]}")
+    return regressions
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="검색 지연/정확도 벤치마크 (오프라인 ES 대역 포함, JSON 출력)")
+    parser.add_argument('--scales', type=float, nargs='+', default=[1, 10, 100], help="실제 상장법인 수 대비 말뭉치 배수")
+    parser.add_argument('--encoder', choices=['hash', 'sbert'], default='hash', help="hash: 오프라인 해싱 임베딩, sbert: 실제 KR-SBERT 모델")
+    parser.add_argument('--dims', type=int, default=768)
+    parser.add_argument('--dtypes', nargs='+', choices=DTYPES, default=list(DTYPES), help="비교할 로컬 색인 dtype")
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=5, help="지연 측정 시 질의 세트 반복 횟수")
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 4, 16], help="동시 클라이언트 수")
+    parser.add_argument('--calls', type=int, default=200, help="처리량 측정 시 총 호출 수")
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="결과 JSON 파일 경로 (없으면 표준 출력)")
+    parser.add_argument('--baseline', help="비교할 이전 결과 JSON (회귀 발견 시 종료 코드 1)")
+    parser.add_argument('--max-regression', type=float, default=0.2, help="허용하는 p95 지연 증가/처리량 감소 비율")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.encoder == 'sbert':
+        from model_loader import get_embedding_model
+        encoder = get_embedding_model()
+    else:
+        encoder = HashingEncoder(args.dims)
+
+    results = []
+    for scale in args.scales:
+        print(f"⏳ {scale:g}x 규모 ({int(BASE_LISTINGS * scale):,}건) 측정 중...", file=sys.stderr)
+        results.extend(run_scale(scale, encoder, args))
+
+    report = {
+        'meta': {
+            'encoder': args.encoder,
+            'dims': args.dims,
+            'k': args.k,
+            'repeat': args.repeat,
+            'clients': args.clients,
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')
+        },
+        'results': results
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare_with_baseline(results, json.load(f), args.max_regression, args.k)
+        for line in regressions:
+            print(f"❌ 회귀: {line}", file=sys.stderr)
+        if regressions:
+            raise SystemExit(1)
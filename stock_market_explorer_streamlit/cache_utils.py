@@ -0,0 +1,131 @@
+from collections import OrderedDict
+import threading
+import time
+import weakref
+
+_MISSING = object()
+
+# 메트릭 수집용: 생성된 모든 캐시 (캐시가 사라지면 자동으로 빠짐)
+_caches = weakref.WeakSet()
+
+class _Flight:
+    """진행 중인 loader 호출 하나 (기다리는 스레드들이 결과를 공유)"""
+    __slots__ = ('done', 'value', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+class LRUCache:
+    """
+    크기 제한(LRU)과 만료 시간(TTL)을 가진 스레드 안전 캐시.
+    Streamlit 세션들이 한 프로세스 안에서 공유하도록 모듈 전역으로 만들어 사용합니다.
+    """
+
+    def __init__(self, maxsize=256, ttl=None, name=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.name = name
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        # hits 중 진행 중이던 loader 결과를 기다려 받은 횟수
+        self.coalesced = 0
+        self._inflight = {}
+        _caches.add(self)
+
+    def __len__(self):
+        return len(self._data)
+
+    def _lookup(self, key):
+        """만료되지 않은 값 또는 _MISSING (잠금을 잡은 상태에서 호출)"""
+        entry = self._data.get(key, _MISSING)
+        if entry is _MISSING:
+            return _MISSING
+        value, expires_at = entry
+        if expires_at is None or expires_at > time.monotonic():
+            self._data.move_to_end(key)
+            return value
+        del self._data[key]
+        return _MISSING
+
+    def get(self, key, default=None):
+        with self._lock:
+            value = self._lookup(key)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return value
+
+    def get_or_load(self, key, loader, ttl=None):
+        """
+        캐시에 있으면 그 값을, 없으면 loader()를 호출해 저장한 뒤 반환합니다. (single-flight)
+        같은 키를 여러 스레드가 동시에 요청하면 loader는 한 번만 실행되고 나머지는 그 결과(또는 예외)를 기다립니다.
+        ttl은 숫자 또는 loader 결과를 받아 TTL을 돌려주는 함수입니다. 예외는 캐시하지 않습니다.
+        """
+        with self._lock:
+            value = self._lookup(key)
+            if value is not _MISSING:
+                self.hits += 1
+                return value
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                self.misses += 1
+                flight = self._inflight[key] = _Flight()
+            else:
+                # 진행 중인 조회 결과를 받아 쓰므로 loader를 다시 부르지 않음: 적중으로 세고 따로 coalesced에도 기록
+                self.hits += 1
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            value = loader()
+            self.set(key, value, ttl(value) if callable(ttl) else ttl)
+            flight.value = value
+            return value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.done.set()
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'name': self.name,
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'hit_rate': self.hits / total if total else 0.0
+        }
+
+
+def all_cache_stats():
+    """이 프로세스에서 만들어진 모든 캐시의 통계 (이름순)"""
+    return sorted((cache.stats() for cache in list(_caches)), key=lambda s: str(s['name']))
@@ -0,0 +1,164 @@
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+from metrics import timed
+import numpy as np
+import pandas as pd
+
+# Streamlit은 실제 화면 폭을 알려주지 않으므로 wide 레이아웃의 좌측 차트 폭을 기준으로 사용
+DEFAULT_CHART_WIDTH = 1200
+PX_PER_POINT = 2
+
+MA_TRACES = [('MA5', '5선', 'orange'), ('MA20', '20선', 'purple'), ('MA60', '60선', 'green')]
+
+def points_for_width(width_px=DEFAULT_CHART_WIDTH, px_per_point=PX_PER_POINT):
+    """차트 폭(px)에 표시할 수 있는 최대 점 개수"""
+    return max(int(width_px // px_per_point), 3)
+
+def format_number(values, decimals=0):
+    """천 단위 구분 기호가 들어간 문자열 배열 (예: 1234567 -> '1,234,567')"""
+    fmt = f'{{:,.{decimals}f}}'.format
+    return np.array([fmt(v) for v in np.asarray(values, dtype=np.float64).tolist()], dtype=object)
+
+def _join_chars(chars):
+    """(N, k) 문자 배열을 길이 k 문자열 N개로 합칩니다."""
+    chars = np.ascontiguousarray(chars)
+    return chars.view(f'<U{chars.shape[1]}').ravel().astype(object)
+
+def format_dates(index, intraday=False):
+    """
+    날짜 인덱스를 툴팁용 문자열로 변환합니다. (분봉: '2026-10-16 09:01', 그 외: '2026년 10월 16일')
+    pandas strftime 대신 numpy datetime_as_string 결과를 문자 단위로 잘라 붙입니다.
+    """
+    if len(index) == 0 or index.hasnans:
+        return index.strftime('%Y-%m-%d %H:%M' if intraday else '%Y년 %m월 %d일').to_numpy(dtype=object)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    if intraday:
+        # 'YYYY-MM-DDTHH:MM'
+        chars = np.datetime_as_string(index.values, unit='m').view('<U1').reshape(len(index), -1).copy()
+        chars[:, 10] = ' '
+        return _join_chars(chars)
+    # 'YYYY-MM-DD'
+    chars = np.datetime_as_string(index.values, unit='D').view('<U1').reshape(len(index), -1)
+    return _join_chars(chars[:, 0:4]) + "년 " + _join_chars(chars[:, 5:7]) + "월 " + _join_chars(chars[:, 8:10]) + "일"
+
+def volume_colors(df):
+    """거래량 막대 색상 (종가 >= 시가 이면 빨강, 아니면 파랑)"""
+    return np.where(df['Close'].to_numpy() >= df['Open'].to_numpy(), 'red', 'blue')
+
+def candle_hover_text(df, intraday=False):
+    dates = format_dates(df.index, intraday)
+    return ("날짜: " + dates
+            + "<br>시가: " + format_number(df['Open']) + "원"
+            + "<br>고가: " + format_number(df['High']) + "원"
+            + "<br>저가: " + format_number(df['Low']) + "원"
+            + "<br>종가: " + format_number(df['Close']) + "원"
+            + "<br>거래량: " + format_number(df['Volume']) + "주")
+
+def index_hover_text(df):
+    dates = format_dates(df.index)
+    return "날짜: " + dates + "<br>지수: " + format_number(df['Close'], 2) + " 포인트"
+
+def decimate_ohlc(df, max_points):
+    """
+    연속된 봉을 max_points개의 구간으로 묶어 OHLCV를 다시 집계합니다. (고가/저가 극값 보존)
+    이동평균 등 나머지 컬럼은 구간의 마지막 값을 사용합니다.
+    """
+    n = len(df)
+    if n <= max_points:
+        return df
+    edges = np.linspace(0, n, max_points + 1).astype(np.int64)
+    starts, ends = edges[:-1], edges[1:] - 1
+
+    out = df.iloc[ends].copy()
+    out.index = df.index[starts]
+    out['Open'] = df['Open'].to_numpy()[starts]
+    out['High'] = np.maximum.reduceat(df['High'].to_numpy(), starts)
+    out['Low'] = np.minimum.reduceat(df['Low'].to_numpy(), starts)
+    out['Volume'] = np.add.reduceat(df['Volume'].to_numpy(), starts)
+    return out
+
+def lttb_indices(x, y, n_out):
+    """Largest-Triangle-Three-Buckets 다운샘플링으로 선택된 행 번호"""
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # 첫 점과 마지막 점 사이를 n_out - 2개 구간으로 나누고, 마지막 구간 다음에는 마지막 점만 둠
+    edges = np.append(np.linspace(1, n - 1, n_out - 1).astype(np.int64), n)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = edges[i + 1], edges[i + 2]
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+def decimate_line(df, column='Close', max_points=None):
+    if max_points is None or len(df) <= max_points:
+        return df
+    x = df.index.asi8 if isinstance(df.index, pd.DatetimeIndex) else np.arange(len(df))
+    return df.iloc[lttb_indices(x, df[column].to_numpy(), max_points)]
+
+@timed()
+def build_stock_figure(price_df, timeframe, max_points=None):
+    """캔들스틱 + 이동평균선 + 거래량 차트. max_points를 넘는 봉은 구간 집계로 줄여서 그립니다."""
+    intraday = timeframe == '분봉'
+    if max_points is not None:
+        price_df = decimate_ohlc(price_df, max_points)
+
+    # 서브플롯 생성 (위: 캔들스틱+이평선, 아래: 거래량)
+    fig = make_subplots(rows=2, cols=1, shared_xaxes=True, vertical_spacing=0.03, row_heights=[0.7, 0.3])
+
+    # 1. 캔들스틱 추가
+    fig.add_trace(go.Candlestick(
+        x=price_df.index, open=price_df['Open'], high=price_df['High'],
+        low=price_df['Low'], close=price_df['Close'],
+        name="주가", increasing_line_color='red', decreasing_line_color='blue',
+        text=candle_hover_text(price_df, intraday), hoverinfo='text'
+    ), row=1, col=1)
+
+    # 2. 이동평균선 추가
+    for column, name, color in MA_TRACES:
+        if column in price_df.columns:
+            fig.add_trace(go.Scatter(x=price_df.index, y=price_df[column], name=name, line=dict(color=color, width=1.5)), row=1, col=1)
+
+    # 3. 거래량 바 차트 추가 (전일 대비 혹은 시가/종가 대비 색상)
+    fig.add_trace(go.Bar(x=price_df.index, y=price_df['Volume'], name='거래량', marker_color=volume_colors(price_df)), row=2, col=1)
+
+    fig.update_layout(height=500, margin=dict(l=20, r=20, t=20, b=20), xaxis_rangeslider_visible=False, showlegend=True)
+    fig.update_xaxes(tickformat="%Y-%m-%d %H:%M" if intraday else "%Y-%m-%d")
+    return fig
+
+@timed()
+def build_index_figure(index_df, max_points=None):
+    """시장 지수 라인 차트. max_points를 넘으면 LTTB로 모양을 유지하며 점 개수를 줄입니다."""
+    index_df = decimate_line(index_df, 'Close', max_points)
+    fig = go.Figure(data=[go.Scatter(
+        x=index_df.index, y=index_df['Close'], mode='lines',
+        line=dict(color='purple', width=2), name="지수",
+        text=index_hover_text(index_df), hoverinfo='text'
+    )])
+    fig.update_layout(height=300, margin=dict(l=20, r=20, t=20, b=20))
+    fig.update_xaxes(tickformat="%Y-%m-%d")
+    return fig
+
+@timed()
+def build_correlation_figure(correlation, labels):
+    """테마 구성 종목 간 일간 수익률 상관계수 히트맵"""
+    fig = go.Figure(data=[go.Heatmap(
+        z=correlation, x=labels, y=labels, zmin=-1, zmax=1, colorscale='RdBu_r',
+        hovertemplate="%{y} / %{x}<br>상관계수: %{z:.2f}<extra></extra>"
+    )])
+    fig.update_layout(height=500, margin=dict(l=20, r=20, t=20, b=20))
+    fig.update_xaxes(showticklabels=len(labels) <= 60)
+    fig.update_yaxes(showticklabels=len(labels) <= 60, autorange='reversed')
+    return fig
@@ -0,0 +1,77 @@
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from stock_utils import get_stock_price_data, get_market_index, get_today_market_ranking, get_stock_volume_rank
+import os
+import threading
+
+# 상세 패널 조회용 스레드 풀 (프로세스 전역에서 공유, 동시에 실행되는 외부 호출 수를 제한)
+MAX_WORKERS = int(os.environ.get('DETAIL_LOADER_WORKERS', 8))
+CALL_TIMEOUT = float(os.environ.get('DETAIL_LOADER_TIMEOUT', 20))
+
+# 첫 차트를 보는 동안 미리 받아 둘 차트 주기 (일봉 한 벌에서 집계되므로 저렴함)
+PREFETCH_TIMEFRAMES = ('월봉', '주봉', '일봉')
+
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='detail-loader')
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+def _submit(key, func, *args, **kwargs):
+    """같은 요청이 이미 진행 중이면 새로 호출하지 않고 그 Future를 돌려줍니다. (Streamlit 재실행 시 중복 호출 방지)"""
+    with _inflight_lock:
+        future = _inflight.get(key)
+        if future is not None:
+            return future
+        future = _executor.submit(func, *args, **kwargs)
+        _inflight[key] = future
+
+    def _done(_):
+        with _inflight_lock:
+            if _inflight.get(key) is future:
+                del _inflight[key]
+    future.add_done_callback(_done)
+    return future
+
+def index_market_for(company_market):
+    """시장구분 -> 지수 차트 기본 시장 (코스닥/코넥스/유가)"""
+    company_market = company_market or "코스닥"
+    if "코넥스" in company_market:
+        return "코넥스"
+    if "유가" in company_market or "KOSPI" in company_market.upper() or "코스피" in company_market:
+        return "유가"
+    return "코스닥"
+
+def submit_price(ticker, timeframe, market):
+    return _submit(('price', ticker, timeframe, market), get_stock_price_data, ticker, timeframe=timeframe, market=market)
+
+def submit_index(market_name):
+    return _submit(('index', market_name), get_market_index, market_name)
+
+def submit_volume_rank(ticker):
+    return _submit(('rank', ticker), get_stock_volume_rank, ticker)
+
+def submit_ranking():
+    """랭킹 패널이 그려지기 전에 시장 스냅샷을 미리 받아 둡니다."""
+    return _submit(('ranking',), get_today_market_ranking)
+
+def start_detail_load(company, timeframe):
+    """
+    기업 상세 패널에 필요한 조회(주가, 시장 지수, 거래량 순위)를 한꺼번에 시작하고
+    나머지 차트 주기는 백그라운드에서 미리 받아 둡니다. 패널 이름 -> Future 딕셔너리를 반환합니다.
+    """
+    ticker = company.get("종목코드", "000000")
+    market = company.get("시장구분", "유가")
+    futures = {
+        'price': submit_price(ticker, timeframe, market),
+        'index': submit_index(index_market_for(market)),
+        'rank': submit_volume_rank(ticker)
+    }
+    for other in PREFETCH_TIMEFRAMES:
+        if other != timeframe:
+            submit_price(ticker, other, market)
+    return futures
+
+def wait_result(future, timeout=CALL_TIMEOUT):
+    """Future 결과를 기다립니다. 시간 초과 시 TimeoutError (백그라운드 호출은 계속 진행되어 다음 요청에 재사용)"""
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        raise TimeoutError(f"응답 시간 초과 ({timeout:.0f}초)") from None
@@ -1,20 +1,128 @@
 from datetime import datetime
-from elasticsearch import Elasticsearch
+from elasticsearch import Elasticsearch, NotFoundError
 from elasticsearch_dsl import Search
-from sentence_transformers import SentenceTransformer
+from vector_index import LocalVectorIndex, current_version
+from cache_utils import LRUCache
+from model_loader import get_query_encoder
+from metrics import timed, timer
+import os
+import threading
+import time
 
 ES_HOST = 'http://localhost:9200'
 
-# AI 모델은 전역으로 한 번만 로드하여 검색 속도 향상
-embedding_model = SentenceTransformer('snunlp/KR-SBERT-V40K-klueNLI-augSTS')
+# 공유 클라이언트 연결 풀 설정: 노드당 최대 연결 수, 유휴 시간(초)이 이보다 길면 연결 풀을 새로 만듦 (0이면 계속 유지)
+ES_POOL_SIZE = int(os.environ.get('ES_POOL_SIZE', 10))
+ES_KEEPALIVE = float(os.environ.get('ES_KEEPALIVE', 300))
+
+# 검색어 벡터는 모델이 바뀌지 않는 한 유효하므로 TTL 없이 크기만 제한, 검색 결과는 색인 갱신을 고려해 TTL 적용
+QUERY_CACHE_SIZE = int(os.environ.get('QUERY_CACHE_SIZE', 1024))
+RESULT_CACHE_SIZE = int(os.environ.get('RESULT_CACHE_SIZE', 256))
+RESULT_CACHE_TTL = float(os.environ.get('RESULT_CACHE_TTL', 300))
+
+# 로컬 색인 교체 여부를 확인하는 간격(초): 이 간격마다 current.json의 버전을 읽어 바뀌었으면 다시 불러옴
+LOCAL_INDEX_CHECK_INTERVAL = float(os.environ.get('LOCAL_INDEX_CHECK_INTERVAL', 30))
+
+# 의미 기반 검색 백엔드: 'elasticsearch'(기본) 또는 'local'(메모리 내 NumPy 색인)
+VECTOR_BACKEND = os.environ.get('VECTOR_BACKEND', 'elasticsearch')
+LOCAL_INDEX_DIR = os.environ.get('LOCAL_INDEX_DIR', 'local_index')
+
+# 검색 결과 목록/버튼/상세 패널에 필요한 필드만 받아 옴
+LIST_SOURCE_FIELDS = ["회사명", "종목코드", "시장구분", "업종", "주요제품", "상장일"]
+PIT_KEEP_ALIVE = '5m'
+
+SEMANTIC_SOURCE_FIELDS = ["회사명", "종목코드", "시장구분", "업종", "주요제품", "상장일", "업종_리스트", "주요제품_리스트"]
+
+_local_indexes = {}
+_local_indexes_lock = threading.Lock()
+
+_client = None
+_client_last_used = 0.0
+_client_lock = threading.Lock()
+
+_query_vector_cache = LRUCache(QUERY_CACHE_SIZE, name='query_vector')
+_result_cache = LRUCache(RESULT_CACHE_SIZE, ttl=RESULT_CACHE_TTL, name='search_result')
 
 def get_client():
-    return Elasticsearch(ES_HOST, request_timeout=30)
+    """프로세스 전체에서 공유하는 Elasticsearch 클라이언트(HTTP 연결 풀)를 반환합니다."""
+    global _client, _client_last_used
+    with _client_lock:
+        now = time.monotonic()
+        if isinstance(_client, Elasticsearch) and ES_KEEPALIVE > 0 and now - _client_last_used > ES_KEEPALIVE:
+            # 오래 쉬는 동안 서버/프록시가 유휴 연결을 끊었을 수 있으므로 연결 풀을 새로 만듦
+            _client.close()
+            _client = None
+        if _client is None:
+            _client = Elasticsearch(ES_HOST, request_timeout=30, connections_per_node=ES_POOL_SIZE, retry_on_timeout=True)
+        _client_last_used = now
+        return _client
+
+def set_client(client):
+    """공유 클라이언트를 교체합니다. (벤치마크의 오프라인 대역 클라이언트 등, None이면 다음 호출 때 새로 생성)"""
+    global _client, _client_last_used
+    with _client_lock:
+        _client = client
+        _client_last_used = time.monotonic()
+
+def normalize_query(query_text):
+    """키워드 검색 캐시 키용 검색어 정규화 (앞뒤/중복 공백 제거, 대소문자 통일 -- ES 분석기도 소문자로 비교)"""
+    return ' '.join(str(query_text).split()).casefold()
+
+def normalize_text(query_text):
+    """임베딩 입력/의미 검색 캐시 키용 정규화 (공백만 정리, 대소문자는 모델 입력에 영향을 주므로 유지)"""
+    return ' '.join(str(query_text).split())
+
+@timed()
+def encode_query(query_text):
+    """검색어를 벡터로 변환합니다. 같은 검색어가 반복되면 모델을 다시 실행하지 않습니다."""
+    # 캐시 키와 모델 입력을 같은 문자열로 맞춤 (대소문자만 다른 검색어가 서로의 벡터를 받지 않도록)
+    key = normalize_text(query_text)
+    query_vector = _query_vector_cache.get(key)
+    if query_vector is None:
+        # 동시에 들어온 다른 세션의 검색어와 한 배치로 묶어 encode
+        with timer('model.encode'):
+            query_vector = get_query_encoder().encode(key).tolist()
+        _query_vector_cache.set(key, query_vector)
+    return query_vector
 
+def get_cache_stats():
+    """검색어 벡터/검색 결과 캐시의 적중(hit)/미스(miss) 통계"""
+    return [_query_vector_cache.stats(), _result_cache.stats()]
+
+def clear_caches():
+    _query_vector_cache.clear()
+    _result_cache.clear()
+
+def get_local_index(index_name):
+    """
+    elastic_bulk.py --export-local 로 저장한 로컬 벡터 색인을 반환합니다.
+    불러온 색인은 프로세스 안에서 공유하고, LOCAL_INDEX_CHECK_INTERVAL마다 저장된 버전을 확인해 새로 내보낸 색인으로 교체합니다.
+    """
+    path = os.path.join(LOCAL_INDEX_DIR, index_name)
+    with _local_indexes_lock:
+        now = time.monotonic()
+        entry = _local_indexes.get(index_name)
+        if entry is not None and now - entry['checked_at'] < LOCAL_INDEX_CHECK_INTERVAL:
+            return entry['index']
+        if entry is None or current_version(path) != entry['index'].version:
+            entry = {'index': LocalVectorIndex.load(path)}
+            # 이전 색인으로 계산한 검색 결과는 더 이상 맞지 않음
+            _result_cache.clear()
+        entry['checked_at'] = now
+        _local_indexes[index_name] = entry
+        return entry['index']
+
+@timed()
 def search_index(index_name, field_name, match_name, max_results=100):
     """
     기존의 키워드 기반 정확도 검색 수행
     """
+    fields = tuple(field_name) if isinstance(field_name, list) else field_name
+    cache_key = ('keyword', index_name, fields, normalize_query(match_name), max_results)
+    response = _result_cache.get(cache_key)
+    if response is not None:
+        return response
+
     client = get_client()
     s = Search(using=client, index=index_name)
     
@@ -26,28 +134,171 @@ def search_index(index_name, field_name, match_name, max_results=100):
         s = s.query("match", **{field_name: match_name})
         
     s = s.extra(size=max_results)
-    response = s.execute()
+    with timer('es.search'):
+        response = s.execute()
+    _result_cache.set(cache_key, response)
     
     return response
 
+@timed()
 def semantic_search(index_name, query_text, max_results=50):
     """
     의미 기반 통합 검색 (Vector Search) 수행
     """
-    client = get_client()
-    
-    # 1. 사용자의 검색어를 벡터로 변환
-    query_vector = embedding_model.encode(query_text).tolist()
-    
+    cache_key = ('semantic', VECTOR_BACKEND, index_name, normalize_text(query_text), max_results)
+    response = _result_cache.get(cache_key)
+    if response is not None:
+        return response
+
+    # 1. 사용자의 검색어를 벡터로 변환 (캐시 적중 시 모델 실행 생략)
+    query_vector = encode_query(query_text)
+
+    if VECTOR_BACKEND == 'local':
+        # 로컬 색인은 ES kNN 응답과 같은 구조를 반환하므로 app.py는 그대로 사용 가능
+        with timer('local_index.search'):
+            response = get_local_index(index_name).search(query_vector, k=max_results, source_fields=SEMANTIC_SOURCE_FIELDS)
+        _result_cache.set(cache_key, response)
+        return response
+
     # 2. Elasticsearch 8.x의 kNN 검색 실행
-    response = client.search(
-        index=index_name,
-        knn={
-            "field": "text_vector",
-            "query_vector": query_vector,
-            "k": max_results,
-            "num_candidates": 100
-        },
-        _source=["회사명", "종목코드", "시장구분", "업종", "주요제품", "상장일", "업종_리스트", "주요제품_리스트"] 
-    )
-    return response
\ No newline at end of file
+    client = get_client()
+    with timer('es.knn'):
+        response = client.search(
+            index=index_name,
+            knn={
+                "field": "text_vector",
+                "query_vector": query_vector,
+                "k": max_results,
+                "num_candidates": 100
+            },
+            _source=SEMANTIC_SOURCE_FIELDS
+        )
+    _result_cache.set(cache_key, response)
+    return response
+
+def _keyword_query(field_name, match_name):
+    if isinstance(field_name, list):
+        return {"multi_match": {"query": match_name, "fields": field_name}}
+    return {"match": {field_name: match_name}}
+
+@timed()
+def open_search_session(index_name):
+    """페이지를 넘기는 동안 같은 색인 스냅샷을 보도록 point-in-time을 엽니다. 실패하면 None"""
+    try:
+        return get_client().open_point_in_time(index=index_name, keep_alive=PIT_KEEP_ALIVE)['id']
+    except Exception:
+        return None
+
+def close_search_session(pit_id):
+    if not pit_id:
+        return
+    try:
+        get_client().close_point_in_time(id=pit_id)
+    except Exception:
+        pass
+
+KEYWORD_SORT = [{"_score": "desc"}, {"종목코드.keyword": {"order": "asc", "unmapped_type": "keyword"}}]
+
+def _fit_cursor(search_after, with_pit):
+    """
+    search_after 값 개수를 요청의 정렬 필드 수에 맞춥니다.
+    PIT 검색은 ES가 정렬 끝에 _shard_doc 값을 자동으로 붙이므로 커서가 한 칸 더 깁니다.
+    (점수, 종목코드) 조합은 문서마다 유일하므로 _shard_doc 값을 버리거나 0으로 채워도 다음 페이지 위치는 같습니다.
+    """
+    values = list(search_after)
+    if not with_pit:
+        return values[:len(KEYWORD_SORT)]
+    return values[:len(KEYWORD_SORT) + 1] if len(values) > len(KEYWORD_SORT) else values + [0]
+
+@timed()
+def keyword_page(index_name, field_name, match_name, page_size=12, search_after=None, pit_id=None, source_fields=LIST_SOURCE_FIELDS):
+    """
+    키워드 검색 결과를 한 페이지씩 가져옵니다.
+    정렬은 (점수, 종목코드) 로 고정하고 이전 페이지 마지막 결과의 sort 값(search_after)으로 다음 페이지를 요청합니다.
+    반환: {'hits': [...], 'total': 전체 건수, 'search_after': 다음 페이지 커서, 'pit_id': 갱신된 PIT ID}
+    """
+    fields = tuple(field_name) if isinstance(field_name, list) else field_name
+    cursor = tuple(search_after) if search_after else None
+    cache_key = ('keyword_page', index_name, fields, normalize_query(match_name), page_size, cursor, tuple(source_fields))
+    page = _result_cache.get(cache_key)
+    if page is not None:
+        return dict(page, pit_id=pit_id)
+
+    body = {
+        "query": _keyword_query(field_name, match_name),
+        "size": page_size,
+        "sort": KEYWORD_SORT,
+        "_source": source_fields,
+        "track_total_hits": True
+    }
+    client = get_client()
+    try:
+        with timer('es.search'):
+            if pit_id:
+                if search_after:
+                    body["search_after"] = _fit_cursor(search_after, with_pit=True)
+                response = client.search(pit={"id": pit_id, "keep_alive": PIT_KEEP_ALIVE}, **body)
+            else:
+                if search_after:
+                    body["search_after"] = _fit_cursor(search_after, with_pit=False)
+                response = client.search(index=index_name, **body)
+    except NotFoundError:
+        if not pit_id:
+            raise
+        # PIT가 만료된 경우: PIT 없는 검색은 _shard_doc 정렬이 없으므로 커서를 정렬 필드 수로 잘라 같은 위치부터 이어서 조회
+        pit_id = None
+        if search_after:
+            body["search_after"] = _fit_cursor(search_after, with_pit=False)
+        with timer('es.search'):
+            response = client.search(index=index_name, **body)
+
+    hits = response["hits"]["hits"]
+    page = {
+        'hits': hits,
+        'total': response["hits"]["total"]["value"],
+        'search_after': hits[-1]["sort"] if len(hits) == page_size else None
+    }
+    _result_cache.set(cache_key, page)
+    return dict(page, pit_id=response["pit_id"] if "pit_id" in response else pit_id)
+
+@timed()
+def semantic_page(index_name, query_text, page=0, page_size=12, max_results=50, source_fields=LIST_SOURCE_FIELDS):
+    """
+    의미 기반 검색 결과를 한 페이지씩 가져옵니다.
+    k를 (page + 1) * page_size 까지만 늘려서 앞 페이지를 볼 때는 적은 후보만 계산합니다.
+    반환: {'hits': [...], 'total': 페이지 계산용 전체 건수 (최대 max_results)}
+    """
+    k = min(max_results, (page + 1) * page_size)
+    from_ = page * page_size
+    cache_key = ('semantic_page', VECTOR_BACKEND, index_name, normalize_text(query_text), page, page_size, max_results, tuple(source_fields))
+    result = _result_cache.get(cache_key)
+    if result is not None:
+        return result
+
+    query_vector = encode_query(query_text)
+    if VECTOR_BACKEND == 'local':
+        with timer('local_index.search'):
+            response = get_local_index(index_name).search(query_vector, k=k, source_fields=source_fields, from_=from_, size=page_size)
+    else:
+        with timer('es.knn'):
+            response = get_client().search(
+                index=index_name,
+                knn={
+                    "field": "text_vector",
+                    "query_vector": query_vector,
+                    "k": k,
+                    "num_candidates": max(100, k)
+                },
+                from_=from_,
+                size=page_size,
+                _source=source_fields
+            )
+
+    # kNN의 total은 k개까지이므로, k개를 다 채웠으면 max_results개가 있다고 보고 페이지 수를 계산
+    found = response["hits"]["total"]["value"]
+    result = {
+        'hits': response["hits"]["hits"],
+        'total': max_results if found >= k else found
+    }
+    _result_cache.set(cache_key, result)
+    return result
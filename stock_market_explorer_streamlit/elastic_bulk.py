@@ -1,9 +1,34 @@
 from elasticsearch import Elasticsearch
 from elasticsearch import helpers
-from sentence_transformers import SentenceTransformer
+from embedding_cache import EmbeddingCache, text_hash
+from vector_index import DTYPES, LocalVectorIndex
+from model_loader import BACKENDS, ENCODER_BACKEND, ENCODER_THREADS, MODEL_NAME, cache_key, load_model
 import pandas as pd
+import argparse
+import hashlib
 import json
+import os
 import re
+import time
+
+ES_HOST = "http://localhost:9200"
+INDEX_NAME = 'stock_info'
+
+# 🌟 벡터 검색을 위한 인덱스 매핑 정의
+MAPPING = {
+    "mappings": {
+        "properties": {
+            "text_vector": {
+                "type": "dense_vector",
+                "dims": 768,
+                "index": True,
+                "similarity": "cosine" # 코사인 유사도 사용
+            },
+            # 증분 적재 시 변경 여부를 판단하기 위한 문서 내용 해시
+            "content_hash": {"type": "keyword"}
+        }
+    }
+}
 
 def get_stock_info():
     base_url = "http://kind.krx.co.kr/corpgeneral/corpList.do"    
@@ -25,49 +50,209 @@ def get_stock_info():
     
     return df
 
-if __name__ == "__main__":
-    print("⏳ 데이터를 다운로드하고 AI 모델을 불러옵니다. (최초 실행 시 모델 다운로드로 시간이 걸릴 수 있습니다.)")
-    df = get_stock_info()
-    
-    # 🌟 한국어 문장 임베딩 모델 로드
-    model = SentenceTransformer('snunlp/KR-SBERT-V40K-klueNLI-augSTS')
-    
-    print("🧠 텍스트를 벡터로 변환 중입니다...")
-    # 통합텍스트를 768차원 벡터로 변환하여 새로운 컬럼에 저장
-    df['text_vector'] = df['통합텍스트'].apply(lambda x: model.encode(x).tolist())
+class StageStats:
+    """단계별 처리 건수와 소요 시간을 누적하여 처리량(rows/s)을 보고합니다."""
 
-    json_str = df.to_json(orient='records')
-    json_records = json.loads(json_str)
+    def __init__(self):
+        self.seconds = {}
+        self.rows = {}
 
-    es = Elasticsearch("http://localhost:9200", request_timeout=60)
-    index_name = 'stock_info'
-    
-    # 🌟 벡터 검색을 위한 인덱스 매핑 정의
-    mapping = {
-        "mappings": {
-            "properties": {
-                "text_vector": {
-                    "type": "dense_vector",
-                    "dims": 768,
-                    "index": True,
-                    "similarity": "cosine" # 코사인 유사도 사용
-                }
-            }
-        }
-    }
-    
-    es.options(ignore_status=[400, 404]).indices.delete(index=index_name)
-    es.options(ignore_status=[400]).indices.create(index=index_name, body=mapping)
-    
-    action_list = []
-    for row in json_records:
-        record = {
+    def add(self, stage, seconds, rows):
+        self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+        self.rows[stage] = self.rows.get(stage, 0) + rows
+
+    def report(self):
+        for stage, seconds in self.seconds.items():
+            rows = self.rows[stage]
+            if seconds <= 0:
+                print(f"   - {stage:<8} {rows:>6}건")
+                continue
+            rate = rows / seconds
+            print(f"   - {stage:<8} {rows:>6}건 / {seconds:7.2f}초 ({rate:,.1f} rows/s)")
+
+def content_hash(row, model_name=MODEL_NAME):
+    """벡터를 제외한 문서 내용과 모델명으로 만든 해시. 값이 같으면 다시 적재할 필요가 없습니다."""
+    payload = json.dumps(row, sort_keys=True, ensure_ascii=False) + model_name
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+def iter_json_chunks(df, chunk_size=500):
+    """NaN/날짜 직렬화 규칙을 기존과 동일하게 유지하기 위해 chunk 단위로 to_json 후 파싱합니다."""
+    for start in range(0, len(df), chunk_size):
+        chunk = df.iloc[start:start + chunk_size]
+        yield chunk, json.loads(chunk.to_json(orient='records'))
+
+def compute_content_hashes(df, chunk_size=500, model_name=MODEL_NAME):
+    """종목코드 -> content_hash 딕셔너리 (model_name에는 추론 백엔드까지 구분한 cache_key 값을 넘김)"""
+    hashes = {}
+    for _, records in iter_json_chunks(df, chunk_size):
+        for row in records:
+            hashes[row['종목코드']] = content_hash(row, model_name)
+    return hashes
+
+def encode_texts(model, texts, batch_size=64, pool=None):
+    """통합텍스트 목록을 batch 단위로 벡터화합니다. pool이 주어지면 여러 CPU 프로세스에 분산합니다."""
+    if pool is not None:
+        return model.encode_multi_process(texts, pool, batch_size=batch_size)
+    return model.encode(texts, batch_size=batch_size, convert_to_numpy=True, show_progress_bar=False)
+
+def encode_with_cache(model, texts, batch_size=64, pool=None, cache=None, stats=None):
+    """캐시에 없는 텍스트만 임베딩하고, 입력 순서대로 (N, dims) 행렬을 반환합니다."""
+    if cache is None:
+        t0 = time.perf_counter()
+        vectors = encode_texts(model, texts, batch_size=batch_size, pool=pool)
+        if stats is not None:
+            stats.add('encode', time.perf_counter() - t0, len(texts))
+        return vectors
+
+    keys = [text_hash(text) for text in texts]
+    missing = {}
+    for key, text in zip(keys, texts):
+        if key not in cache and key not in missing:
+            missing[key] = text
+    if missing:
+        t0 = time.perf_counter()
+        vectors = encode_texts(model, list(missing.values()), batch_size=batch_size, pool=pool)
+        if stats is not None:
+            stats.add('encode', time.perf_counter() - t0, len(missing))
+        cache.put_many(list(missing.keys()), vectors)
+    if stats is not None:
+        stats.add('cache', 0.0, len(texts) - len(missing))
+    return cache.get_many(keys)
+
+def iter_records(df, model, chunk_size=500, batch_size=64, pool=None, stats=None, cache=None, model_name=MODEL_NAME):
+    """
+    chunk_size 행씩 잘라 임베딩한 뒤 레코드를 하나씩 내보내는 제너레이터.
+    전체 데이터프레임을 JSON으로 한 번에 변환하지 않으므로 메모리 사용량이 chunk 크기로 제한됩니다.
+    """
+    for chunk, records in iter_json_chunks(df, chunk_size):
+        vectors = encode_with_cache(model, chunk['통합텍스트'].tolist(), batch_size=batch_size,
+                                    pool=pool, cache=cache, stats=stats)
+        for row, vector in zip(records, vectors):
+            row['content_hash'] = content_hash(row, model_name)
+            row['text_vector'] = vector.tolist()
+            yield row
+
+def generate_actions(records, index_name=INDEX_NAME, delete_ids=()):
+    """종목코드를 문서 ID로 하는 upsert 액션을 먼저 보내고, 상장폐지 등으로 사라진 문서의 삭제 액션을 뒤에 보냅니다."""
+    for row in records:
+        yield {
             '_op_type': 'index',
             '_index': index_name,
+            '_id': row['종목코드'],
             '_source': row
         }
-        action_list.append(record)
-        
-    print("💾 Elasticsearch에 데이터를 적재합니다...")
-    helpers.bulk(es, action_list)
-    print("✅ 데이터 전처리 및 벡터 적재 완료!")
\ No newline at end of file
+    for doc_id in delete_ids:
+        yield {
+            '_op_type': 'delete',
+            '_index': index_name,
+            '_id': doc_id
+        }
+
+def fetch_indexed_hashes(es, index_name=INDEX_NAME):
+    """현재 인덱스에 적재된 문서 ID -> content_hash 딕셔너리"""
+    indexed = {}
+    for hit in helpers.scan(es, index=index_name, query={"query": {"match_all": {}}}, _source=['content_hash']):
+        indexed[hit['_id']] = hit.get('_source', {}).get('content_hash')
+    return indexed
+
+def plan_incremental(current_hashes, indexed_hashes):
+    """(다시 적재할 종목코드 목록, 삭제할 문서 ID 목록)을 반환합니다."""
+    changed = [code for code, h in current_hashes.items() if indexed_hashes.get(code) != h]
+    deleted = [doc_id for doc_id in indexed_hashes if doc_id not in current_hashes]
+    return changed, deleted
+
+def bulk_load(es, actions, chunk_size=500, threads=1):
+    """streaming_bulk(단일 스레드) 또는 parallel_bulk(멀티 스레드)로 적재하고 (성공, 실패) 건수를 반환합니다."""
+    if threads > 1:
+        results = helpers.parallel_bulk(es, actions, thread_count=threads, chunk_size=chunk_size, raise_on_error=False)
+    else:
+        results = helpers.streaming_bulk(es, actions, chunk_size=chunk_size, raise_on_error=False)
+
+    success, failed = 0, 0
+    for ok, info in results:
+        if ok:
+            success += 1
+        else:
+            failed += 1
+            if failed <= 5:
+                print(f"⚠️ 적재 실패: {info}")
+    return success, failed
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="KRX 상장법인 정보를 임베딩하여 Elasticsearch에 적재합니다.")
+    parser.add_argument('--batch-size', type=int, default=64, help="모델 encode 배치 크기")
+    parser.add_argument('--workers', type=int, default=0, help="임베딩에 사용할 CPU 프로세스 수 (0이면 단일 프로세스)")
+    parser.add_argument('--chunk-size', type=int, default=500, help="임베딩/적재 단위 행 수")
+    parser.add_argument('--bulk-threads', type=int, default=1, help="parallel_bulk 스레드 수 (1이면 streaming_bulk)")
+    parser.add_argument('--full', action='store_true', help="인덱스를 삭제 후 다시 생성하여 전체 적재 (기본: 변경분만 증분 적재)")
+    parser.add_argument('--cache-dir', default='.embedding_cache', help="임베딩 캐시 디렉터리")
+    parser.add_argument('--no-cache', action='store_true', help="임베딩 캐시를 사용하지 않음")
+    parser.add_argument('--export-local', metavar='DIR', help="app의 VECTOR_BACKEND=local 용 로컬 벡터 색인을 DIR/<인덱스명>에 저장")
+    parser.add_argument('--encoder-backend', choices=BACKENDS, default=ENCODER_BACKEND,
+                        help="CPU 추론 백엔드 (torch: fp32, int8: 동적 양자화, onnx: ONNX Runtime). 바꾼 뒤에는 --full로 다시 적재 권장")
+    parser.add_argument('--threads', type=int, default=ENCODER_THREADS, help="추론 스레드 수 (0이면 기본값)")
+    parser.add_argument('--local-dtype', choices=DTYPES, default='float32', help="로컬 벡터 색인 저장 dtype")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    stats = StageStats()
+
+    print("⏳ 데이터를 다운로드하고 AI 모델을 불러옵니다. (최초 실행 시 모델 다운로드로 시간이 걸릴 수 있습니다.)")
+    t0 = time.perf_counter()
+    df = get_stock_info()
+    stats.add('download', time.perf_counter() - t0, len(df))
+
+    # 백엔드마다 벡터가 조금씩 다르므로 임베딩 캐시와 content_hash 모두 백엔드까지 구분 (백엔드를 바꾸면 전체 재적재)
+    model_name = cache_key(MODEL_NAME, args.encoder_backend)
+    cache = None if args.no_cache else EmbeddingCache(args.cache_dir, model_name)
+
+    es = Elasticsearch(ES_HOST, request_timeout=60)
+
+    current_hashes = compute_content_hashes(df, args.chunk_size, model_name)
+    if args.full or not es.indices.exists(index=INDEX_NAME):
+        es.options(ignore_status=[400, 404]).indices.delete(index=INDEX_NAME)
+        es.options(ignore_status=[400]).indices.create(index=INDEX_NAME, body=MAPPING)
+        targets, deleted = df, []
+    else:
+        # 🌟 증분 모드: 인덱스를 유지한 채 변경/신규 종목만 upsert, 사라진 종목만 delete
+        es.indices.put_mapping(index=INDEX_NAME, properties={"content_hash": MAPPING["mappings"]["properties"]["content_hash"]})
+        changed, deleted = plan_incremental(current_hashes, fetch_indexed_hashes(es, INDEX_NAME))
+        targets = df[df['종목코드'].isin(changed)]
+        print(f"🔍 변경/신규 {len(targets)}건, 삭제 {len(deleted)}건, 유지 {len(df) - len(targets)}건")
+
+    # 🌟 한국어 문장 임베딩 모델 로드 (캐시로 모두 해결되면 모델을 불러오지 않음)
+    model, pool = None, None
+    needed = df if args.export_local else targets
+    if cache is None or any(text_hash(text) not in cache for text in needed['통합텍스트']):
+        model = load_model(args.encoder_backend, args.threads)
+        pool = model.start_multi_process_pool(['cpu'] * args.workers) if args.workers > 1 else None
+
+    print("🧠 텍스트를 벡터로 변환하면서 Elasticsearch에 데이터를 적재합니다...")
+    try:
+        # 통합텍스트를 768차원 벡터로 변환하여 text_vector 필드로 스트리밍 적재
+        records = iter_records(targets, model, chunk_size=args.chunk_size, batch_size=args.batch_size,
+                               pool=pool, stats=stats, cache=cache, model_name=model_name)
+        t0 = time.perf_counter()
+        success, failed = bulk_load(es, generate_actions(records, delete_ids=deleted),
+                                    chunk_size=args.chunk_size, threads=args.bulk_threads)
+        # 적재 단계 시간에는 제너레이터 내부의 임베딩 시간이 포함되므로 분리하여 기록
+        stats.add('bulk', time.perf_counter() - t0 - stats.seconds.get('encode', 0.0), success + failed)
+
+        if args.export_local:
+            # ES에 적재한 것과 같은 레코드로 로컬 벡터 색인 생성 (캐시가 있으면 재임베딩 없음)
+            t0 = time.perf_counter()
+            records = iter_records(df, model, chunk_size=args.chunk_size, batch_size=args.batch_size, pool=pool, cache=cache,
+                                   model_name=model_name)
+            local_index = LocalVectorIndex.build(records, dtype=args.local_dtype, index_name=INDEX_NAME)
+            local_index.save(os.path.join(args.export_local, INDEX_NAME))
+            stats.add('export', time.perf_counter() - t0, len(local_index))
+    finally:
+        if pool is not None:
+            model.stop_multi_process_pool(pool)
+
+    if cache is not None and failed == 0:
+        cache.prune(df['통합텍스트'].map(text_hash))
+
+    print(f"✅ 데이터 전처리 및 벡터 적재 완료! (성공 {success}건, 실패 {failed}건)")
+    stats.report()
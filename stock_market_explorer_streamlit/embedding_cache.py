@@ -0,0 +1,110 @@
+import hashlib
+import json
+import os
+import re
+import time
+import numpy as np
+
+def text_hash(text):
+    """통합텍스트의 내용 해시 (임베딩 캐시 키)"""
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+class EmbeddingCache:
+    """
+    통합텍스트 해시 -> 임베딩 벡터를 디스크에 보관하는 캐시.
+    모델별 디렉터리에 float32 행렬(vectors*.f32, memory-map으로 읽음)과
+    해시 -> 행 번호 색인(index.json)을 저장합니다.
+
+    index.json이 현재 벡터 파일 이름도 함께 가리키므로, prune()은 새 이름의 파일을 다 쓴 뒤
+    index.json 한 번의 교체로 (벡터 파일, 행 번호) 쌍을 함께 바꿉니다. 중간에 중단되어도 이전 쌍이 그대로 남습니다.
+    """
+
+    def __init__(self, cache_dir, model_name, dims=768):
+        self.dims = dims
+        self.model_name = model_name
+        self.dir = os.path.join(cache_dir, re.sub(r'[^0-9A-Za-z._-]+', '_', model_name))
+        self.index_path = os.path.join(self.dir, 'index.json')
+        os.makedirs(self.dir, exist_ok=True)
+
+        self.index = {}
+        vectors_file = 'vectors.f32'
+        if os.path.exists(self.index_path):
+            with open(self.index_path, encoding='utf-8') as f:
+                saved = json.load(f)
+            if 'rows' in saved and 'vectors' in saved:
+                vectors_file, self.index = saved['vectors'], saved['rows']
+            else:
+                # 이전 형식: 해시 -> 행 번호만 저장 (벡터 파일은 vectors.f32)
+                self.index = saved
+        self.vectors_path = os.path.join(self.dir, vectors_file)
+        # 색인 저장 전에 중단된 경우 벡터 파일 끝에 남은 행은 무시
+        self.rows = min(self._rows_on_disk(), len(self.index))
+        self.index = {h: row for h, row in self.index.items() if row < self.rows}
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def _rows_on_disk(self):
+        if not os.path.exists(self.vectors_path):
+            return 0
+        return os.path.getsize(self.vectors_path) // (self.dims * 4)
+
+    def _matrix(self):
+        if self.rows == 0:
+            return np.empty((0, self.dims), dtype=np.float32)
+        return np.memmap(self.vectors_path, dtype=np.float32, mode='r', shape=(self.rows, self.dims))
+
+    def _save_index(self):
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'vectors': os.path.basename(self.vectors_path), 'rows': self.index}, f)
+        os.replace(tmp_path, self.index_path)
+
+    def get_many(self, keys):
+        """keys 순서대로 (N, dims) 행렬을 반환합니다. 모든 키가 캐시에 있어야 합니다."""
+        rows = [self.index[k] for k in keys]
+        return np.asarray(self._matrix()[rows], dtype=np.float32)
+
+    def put_many(self, keys, vectors):
+        """새 벡터를 파일 끝에 추가한 뒤 색인을 원자적으로 교체합니다."""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, self.dims)
+        new_keys, new_rows = [], []
+        for key, vector in zip(keys, vectors):
+            if key not in self.index and key not in new_keys:
+                new_keys.append(key)
+                new_rows.append(vector)
+        if not new_keys:
+            return
+
+        # 벡터 파일 끝이 색인과 어긋나 있으면(이전 실행 중단) 잘라낸 뒤 추가
+        with open(self.vectors_path, 'ab') as f:
+            f.truncate(self.rows * self.dims * 4)
+            f.write(np.stack(new_rows).tobytes())
+        for i, key in enumerate(new_keys):
+            self.index[key] = self.rows + i
+        self.rows += len(new_keys)
+        self._save_index()
+
+    def prune(self, keep_keys):
+        """현재 사용 중인 키만 남긴 벡터 파일을 새 이름으로 쓰고 색인을 교체한 뒤 이전 파일을 지웁니다."""
+        keep_keys = [k for k in dict.fromkeys(keep_keys) if k in self.index]
+        if len(keep_keys) == len(self.index):
+            return
+        matrix = self.get_many(keep_keys) if keep_keys else np.empty((0, self.dims), dtype=np.float32)
+
+        new_path = os.path.join(self.dir, f"vectors.{time.time_ns()}.f32")
+        with open(new_path, 'wb') as f:
+            f.write(matrix.tobytes())
+        self.vectors_path = new_path
+        self.index = {k: i for i, k in enumerate(keep_keys)}
+        self.rows = len(keep_keys)
+        self._save_index()
+
+        # 색인이 새 파일을 가리키게 된 뒤에만 이전 파일과 중단된 prune이 남긴 파일을 정리
+        for name in os.listdir(self.dir):
+            path = os.path.join(self.dir, name)
+            if name.startswith('vectors') and name.endswith('.f32') and path != new_path:
+                os.remove(path)
@@ -0,0 +1,79 @@
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+# 앱 첫 화면까지 import 되는 모듈 (app.py는 streamlit 실행 환경이 필요하므로 그 의존 모듈을 직접 측정)
+APP_MODULES = ['streamlit', 'chart_data', 'elastic_api', 'stock_utils', 'detail_loader', 'intraday_store', 'model_loader', 'theme_index']
+
+# 앱 모듈이 더 이상 import 시점에 불러오면 안 되는 무거운 패키지
+HEAVY_PACKAGES = ['torch', 'sentence_transformers', 'transformers', 'yfinance', 'pykrx', 'FinanceDataReader']
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+def run_importtime(modules):
+    """새 인터프리터에서 python -X importtime 으로 modules를 import 하고 (모듈, 자체 μs, 누적 μs, 깊이) 목록과 전체 시간을 반환합니다."""
+    code = "; ".join(f"import {module}" for module in modules)
+    code += "; import sys, json; print(json.dumps(sorted(sys.modules)))"
+    t0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                          capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    wall = time.perf_counter() - t0
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "import 실패")
+
+    entries = []
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+    loaded = json.loads(proc.stdout.strip().splitlines()[-1])
+    return entries, wall, loaded
+
+def breakdown(entries):
+    """최상위 패키지별 누적 import 시간(ms)"""
+    totals = {}
+    for name, self_us, _, _ in entries:
+        top = name.split('.')[0]
+        totals[top] = totals.get(top, 0) + self_us
+    return {name: round(us / 1000, 1) for name, us in sorted(totals.items(), key=lambda x: -x[1])}
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="앱 콜드 스타트 import 시간 분석 (python -X importtime 기반, JSON 출력 지원)")
+    parser.add_argument('modules', nargs='*', default=APP_MODULES, help="측정할 모듈 (기본: 앱 첫 화면 의존 모듈)")
+    parser.add_argument('--top', type=int, default=15, help="표시할 상위 패키지 수")
+    parser.add_argument('--json', action='store_true', help="결과를 JSON으로 출력")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    entries, wall, loaded = run_importtime(args.modules)
+    packages = breakdown(entries)
+    own = {name: round(cumulative_us / 1000, 1) for name, _, cumulative_us, _ in entries if name in args.modules}
+    heavy = [name for name in HEAVY_PACKAGES if name in loaded]
+
+    if args.json:
+        print(json.dumps({
+            'modules': args.modules,
+            'wall_seconds': round(wall, 3),
+            'import_ms_total': round(sum(e[1] for e in entries) / 1000, 1),
+            'module_cumulative_ms': own,
+            'package_ms': packages,
+            'heavy_loaded': heavy
+        }, ensure_ascii=False, indent=2))
+    else:
+        print(f"⏱️ 인터프리터 시작 + import 전체: {wall:.2f}초 (import 합계 {sum(e[1] for e in entries) / 1000:.0f}ms)")
+        print("\n[모듈별 누적 import 시간]")
+        for name, ms in own.items():
+            print(f"  {name:<24} {ms:>9.1f} ms")
+        print(f"\n[패키지별 import 시간 상위 {args.top}]")
+        for name, ms in list(packages.items())[:args.top]:
+            print(f"  {name:<24} {ms:>9.1f} ms")
+        if heavy:
+            print(f"\n⚠️ 시작 시점에 무거운 패키지가 로드됨: {', '.join(heavy)}")
+        else:
+            print("\n✅ torch/sentence_transformers/yfinance/pykrx/FinanceDataReader는 필요할 때까지 로드되지 않습니다.")
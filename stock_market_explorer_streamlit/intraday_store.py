@@ -0,0 +1,153 @@
+from cache_utils import LRUCache
+from metrics import timer
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+
+# 보관할 최근 거래일 수와 하루 최대 1분봉 수 (KRX 정규장 09:00~15:30 = 390분 + 동시호가 여유분)
+INTRADAY_DAYS = int(os.environ.get('INTRADAY_DAYS', 7))
+BARS_PER_DAY = 400
+# 자동 갱신 주기(초). 저장소는 이보다 조금 짧은 간격이 지나면 새 봉을 조회 (타이머 오차로 한 주기를 건너뛰지 않도록)
+INTRADAY_REFRESH = int(os.environ.get('INTRADAY_REFRESH', 30))
+INTRADAY_TZ = 'Asia/Seoul'
+
+COLUMNS = ('Open', 'High', 'Low', 'Close', 'Volume')
+
+def yf_symbol(ticker, market='유가'):
+    return f"{ticker}{'.KS' if '유가' in market else '.KQ'}"
+
+def yf_minute_reader(symbol, start=None, period=None):
+    """
+    yfinance 1분봉 조회. start가 있으면 그 시각 이후만, 없으면 period 전체를 받습니다.
+    반환 인덱스는 한국 시간 기준의 tz-naive 시각입니다.
+    """
+    import yfinance as yf
+    if start is not None:
+        df = yf.download(symbol, start=pd.Timestamp(start).tz_localize(INTRADAY_TZ), interval="1m", progress=False)
+    else:
+        df = yf.download(symbol, period=period or f"{INTRADAY_DAYS}d", interval="1m", progress=False)
+    # yfinance 최신 버전의 MultiIndex 컬럼 평탄화
+    if not df.empty and isinstance(df.columns, pd.MultiIndex):
+        df.columns = df.columns.get_level_values(0)
+    if not df.empty and df.index.tz is not None:
+        df.index = df.index.tz_convert(INTRADAY_TZ).tz_localize(None)
+    return df
+
+class IntradayRing:
+    """
+    1분봉 OHLCV를 고정 크기 배열에 순환 저장하는 버퍼.
+    용량을 넘으면 가장 오래된 봉부터 덮어쓰므로 메모리 사용량이 일정하고, 새 봉 추가는 꼬리에만 씁니다.
+    """
+
+    def __init__(self, capacity=INTRADAY_DAYS * BARS_PER_DAY):
+        self.capacity = capacity
+        self.timestamps = np.zeros(capacity, dtype=np.int64)
+        self.values = np.zeros((capacity, len(COLUMNS)), dtype=np.float64)
+        self.start = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def _pos(self, i):
+        return (self.start + i) % self.capacity
+
+    def last_timestamp(self):
+        """가장 최근 봉의 시각 (비어 있으면 None)"""
+        if self.size == 0:
+            return None
+        return pd.Timestamp(int(self.timestamps[self._pos(self.size - 1)]))
+
+    def append(self, df):
+        """
+        df의 봉 중 마지막 봉 시각 이후의 것만 추가합니다.
+        마지막 봉과 같은 시각의 봉은 진행 중이던 1분봉의 최종 값이므로 덮어씁니다. 추가/갱신된 봉 수를 반환합니다.
+        """
+        if df is None or df.empty:
+            return 0
+        stamps = df.index.values.astype('datetime64[ns]').view('int64')
+        values = df[list(COLUMNS)].to_numpy(dtype=np.float64)
+        order = np.argsort(stamps, kind='stable')
+        stamps, values = stamps[order], values[order]
+
+        written = 0
+        if self.size:
+            last_pos = self._pos(self.size - 1)
+            last = self.timestamps[last_pos]
+            same = stamps == last
+            if same.any():
+                self.values[last_pos] = values[same][-1]
+                written += 1
+            newer = stamps > last
+            stamps, values = stamps[newer], values[newer]
+        if len(stamps) > 1:
+            keep = np.append(stamps[1:] != stamps[:-1], True)
+            stamps, values = stamps[keep], values[keep]
+        if len(stamps) > self.capacity:
+            stamps, values = stamps[-self.capacity:], values[-self.capacity:]
+
+        n = len(stamps)
+        if n:
+            positions = (self.start + self.size + np.arange(n)) % self.capacity
+            self.timestamps[positions] = stamps
+            self.values[positions] = values
+            overflow = max(0, self.size + n - self.capacity)
+            self.start = (self.start + overflow) % self.capacity
+            self.size = min(self.capacity, self.size + n)
+        return written + n
+
+    def to_frame(self):
+        """오래된 봉부터 시간순으로 정렬된 DataFrame 복사본"""
+        positions = self._pos(np.arange(self.size))
+        index = pd.DatetimeIndex(self.timestamps[positions].view('datetime64[ns]'), name='Datetime')
+        return pd.DataFrame(self.values[positions], index=index, columns=list(COLUMNS))
+
+class IntradayStore:
+    """
+    종목별 1분봉 링 버퍼 보관소. 처음에는 최근 INTRADAY_DAYS일을 받고,
+    이후에는 마지막 봉 시각부터의 꼬리만 받아 버퍼에 덧붙입니다.
+    """
+
+    def __init__(self, reader=None, days=INTRADAY_DAYS, min_refresh=INTRADAY_REFRESH * 0.8, max_tickers=64):
+        self.reader = reader or yf_minute_reader
+        self.days = days
+        self.min_refresh = min_refresh
+        self._rings = LRUCache(maxsize=max_tickers, name='intraday')
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    def _lock(self, symbol):
+        with self._locks_lock:
+            return self._locks.setdefault(symbol, threading.Lock())
+
+    def get(self, ticker, market='유가'):
+        """최근 1분봉 DataFrame. 갱신 주기가 지났으면 새 봉만 받아 반영한 뒤 반환합니다."""
+        symbol = yf_symbol(ticker, market)
+        with self._lock(symbol):
+            entry = self._rings.get(symbol)
+            now = time.monotonic()
+            if entry is None:
+                ring = IntradayRing(self.days * BARS_PER_DAY)
+                with timer('upstream.yfinance'):
+                    ring.append(self.reader(symbol, period=f"{self.days}d"))
+                entry = {'ring': ring, 'fetched_at': now}
+            elif now - entry['fetched_at'] >= self.min_refresh:
+                ring = entry['ring']
+                last = ring.last_timestamp()
+                try:
+                    with timer('upstream.yfinance'):
+                        tail = self.reader(symbol, start=last) if last is not None else self.reader(symbol, period=f"{self.days}d")
+                    ring.append(tail)
+                except Exception as e:
+                    # 꼬리 조회에 실패해도 이미 가진 봉으로 응답
+                    print(f"⚠️ {symbol} 분봉 갱신 실패, 보관 중인 데이터를 사용합니다. ({e})")
+                entry['fetched_at'] = now
+            self._rings.set(symbol, entry)
+            return entry['ring'].to_frame()
+
+_default_store = IntradayStore()
+
+def get_intraday_store():
+    return _default_store
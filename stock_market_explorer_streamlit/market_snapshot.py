@@ -0,0 +1,103 @@
+from cache_utils import LRUCache
+from metrics import timer
+import datetime
+import threading
+import numpy as np
+import pandas as pd
+
+# 당일 스냅샷은 장중 시세 변화를 반영하도록 TTL이 지나면 다시 조회 (기존 랭킹 캐시와 동일한 10분)
+SNAPSHOT_TTL = 600
+
+_trading_day_cache = LRUCache(maxsize=8, ttl=SNAPSHOT_TTL, name='trading_day')
+_snapshot_cache = LRUCache(maxsize=8, ttl=SNAPSHOT_TTL, name='market_snapshot')
+_ticker_names_cache = LRUCache(maxsize=8, name='ticker_names')
+_snapshot_lock = threading.Lock()
+
+def get_last_trading_day(today=None):
+    """데이터가 존재하는 가장 최근 영업일(YYYYMMDD)을 찾습니다. 같은 날짜에 대한 조회는 캐시됩니다."""
+    today = (today or datetime.datetime.today()).strftime("%Y%m%d")
+    trading_day = _trading_day_cache.get(today)
+    if trading_day is None:
+        from pykrx import stock
+        with timer('upstream.pykrx'):
+            trading_day = stock.get_nearest_business_day_in_a_week(today, prev=True)
+        _trading_day_cache.set(today, trading_day)
+    return trading_day
+
+def get_ticker_names(date, market="KOSPI"):
+    """
+    해당 영업일 시장 전체의 티커 -> 종목명 딕셔너리.
+    종목마다 이름을 조회하지 않고 전 종목 등락률 목록(종목명 포함)을 한 번 받아 만듭니다.
+    """
+    key = (market, date)
+    names = _ticker_names_cache.get(key)
+    if names is None:
+        from pykrx import stock
+        with timer('upstream.pykrx'):
+            listing = stock.get_market_price_change_by_ticker(date, date, market=market)
+        names = listing['종목명'].to_dict() if '종목명' in listing.columns else {}
+        # 빈 결과는 일시적인 조회 실패일 수 있으므로 보관하지 않음
+        if names:
+            _ticker_names_cache.set(key, names)
+    return names
+
+class MarketSnapshot:
+    """
+    특정 영업일의 시장 전체 OHLCV를 한 번만 받아 두고,
+    거래량/등락률 순위를 미리 argsort 해 두어 상위 N개와 종목별 순위를 바로 조회합니다.
+    """
+
+    def __init__(self, date, ohlcv, names=None):
+        self.date = date
+        self.df = ohlcv.reset_index() if not ohlcv.empty else pd.DataFrame(columns=['티커', '종가', '거래량', '등락률'])
+        self.tickers = self.df['티커'].to_numpy()
+        self.position = {ticker: i for i, ticker in enumerate(self.tickers)}
+        self.df['종목명'] = [names.get(t, t) for t in self.tickers] if names else self.tickers
+
+        volume = self.df['거래량'].to_numpy(dtype=np.float64)
+        change = self.df['등락률'].to_numpy(dtype=np.float64)
+        self.orders = {
+            ('거래량', False): np.argsort(-volume, kind='stable'),
+            ('등락률', False): np.argsort(-change, kind='stable'),
+            ('등락률', True): np.argsort(change, kind='stable')
+        }
+        # 종목별 거래량 순위 (1부터 시작)
+        self.volume_rank = np.empty(len(self.tickers), dtype=np.int64)
+        self.volume_rank[self.orders[('거래량', False)]] = np.arange(1, len(self.tickers) + 1)
+
+    def __len__(self):
+        return len(self.tickers)
+
+    def top(self, by, n=10, ascending=False, columns=None):
+        order = self.orders[(by, ascending)][:n]
+        columns = columns or ['종목명', '종가', by]
+        return self.df.iloc[order][columns]
+
+    def get_volume_rank(self, ticker):
+        """(거래량 순위, 전체 종목 수). 해당 영업일에 거래 데이터가 없으면 순위는 None"""
+        i = self.position.get(ticker)
+        if i is None:
+            return None, len(self)
+        return int(self.volume_rank[i]), len(self)
+
+def get_market_snapshot(market="KOSPI", with_names=True):
+    """
+    시장별 스냅샷을 프로세스 전역에서 공유합니다.
+    여러 세션이 동시에 요청해도 같은 시장·영업일의 전체 시세는 한 번만 다운로드합니다.
+    """
+    date = get_last_trading_day()
+    key = (market, date, with_names)
+    snapshot = _snapshot_cache.get(key)
+    if snapshot is not None:
+        return snapshot
+
+    with _snapshot_lock:
+        snapshot = _snapshot_cache.get(key)
+        if snapshot is None:
+            from pykrx import stock
+            with timer('upstream.pykrx'):
+                ohlcv = stock.get_market_ohlcv(date, market=market)
+            names = get_ticker_names(date, market) if with_names and not ohlcv.empty else None
+            snapshot = MarketSnapshot(date, ohlcv, names)
+            _snapshot_cache.set(key, snapshot)
+    return snapshot
@@ -0,0 +1,232 @@
+from cache_utils import all_cache_stats
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import functools
+import os
+import threading
+import time
+
+# 계측 활성화 여부 (꺼져 있으면 데코레이터/타이머는 전역 플래그 한 번만 확인하고 바로 원래 함수를 실행)
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '0') == '1'
+# Prometheus 텍스트 노출: HTTP 포트(0이면 끔)와 주기적으로 기록할 파일 경로
+METRICS_PORT = int(os.environ.get('METRICS_PORT', 0))
+# HTTP 노출 주소 (기본은 로컬에서만 접근, 외부 수집기가 직접 긁어야 하면 0.0.0.0 등으로 지정)
+METRICS_HOST = os.environ.get('METRICS_HOST', '127.0.0.1')
+METRICS_FILE = os.environ.get('METRICS_FILE')
+METRICS_FILE_INTERVAL = float(os.environ.get('METRICS_FILE_INTERVAL', 15))
+
+METRIC_PREFIX = 'stock_explorer'
+# 지연 히스토그램 버킷 상한(초)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_enabled = METRICS_ENABLED
+_histograms = {}
+_counters = {}
+_lock = threading.Lock()
+_exporters_started = False
+
+class Histogram:
+    """누적 버킷 방식의 지연 히스토그램 (호출 수, 합계, 오류 수 포함)"""
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.errors = 0
+
+    def observe(self, seconds, error=False):
+        i = 0
+        while i < len(BUCKETS) and seconds > BUCKETS[i]:
+            i += 1
+        self.buckets[i] += 1
+        self.count += 1
+        self.total += seconds
+        if error:
+            self.errors += 1
+
+    def quantile(self, q):
+        """버킷 상한으로 추정한 분위수(초). 마지막 버킷을 넘으면 가장 큰 상한을 반환합니다."""
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank:
+                return BUCKETS[min(i, len(BUCKETS) - 1)]
+        return BUCKETS[-1]
+
+def enable(flag=True):
+    global _enabled
+    _enabled = flag
+
+def is_enabled():
+    return _enabled
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+
+def observe(stage, seconds, error=False):
+    with _lock:
+        histogram = _histograms.get(stage)
+        if histogram is None:
+            histogram = _histograms[stage] = Histogram()
+        histogram.observe(seconds, error)
+
+def inc(name, amount=1, **labels):
+    """카운터 증가 (예: inc('stale_fallbacks', source='fdr'))"""
+    if not _enabled:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+class timer:
+    """
+    with timer('stage'): 블록의 실행 시간을 stage 히스토그램에 기록합니다.
+    블록에서 예외가 나면 오류로 함께 기록하고 예외는 그대로 전달합니다.
+    """
+    __slots__ = ('stage', 'start')
+
+    def __init__(self, stage):
+        self.stage = stage
+        self.start = None
+
+    def __enter__(self):
+        if _enabled:
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.start is not None:
+            observe(self.stage, time.perf_counter() - self.start, exc_type is not None)
+        return False
+
+def timed(stage=None):
+    """함수 실행 시간을 기록하는 데코레이터. stage를 생략하면 '모듈.함수명'을 사용합니다."""
+    def decorator(func):
+        name = stage or f"{func.__module__}.{func.__name__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except BaseException:
+                observe(name, time.perf_counter() - start, True)
+                raise
+            observe(name, time.perf_counter() - start)
+            return result
+        return wrapper
+    return decorator
+
+def snapshot():
+    """단계별 요약 (디버그 사이드바용): 호출 수, 오류 수, 평균/p50/p95 지연(ms)"""
+    with _lock:
+        items = [(stage, h.count, h.errors, h.total, h.quantile(0.5), h.quantile(0.95)) for stage, h in _histograms.items()]
+        counters = dict(_counters)
+    stages = [{
+        'stage': stage,
+        'count': count,
+        'errors': errors,
+        'mean_ms': round(total / count * 1000, 2) if count else None,
+        'p50_ms': None if p50 is None else p50 * 1000,
+        'p95_ms': None if p95 is None else p95 * 1000
+    } for stage, count, errors, total, p50, p95 in sorted(items, key=lambda x: -x[3])]
+    counters = [{'name': name, 'labels': dict(labels), 'value': value} for (name, labels), value in sorted(counters.items())]
+    return {'stages': stages, 'counters': counters, 'caches': all_cache_stats()}
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(**labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + '}'
+
+def render_prometheus():
+    """Prometheus 텍스트 노출 형식 (text/plain; version=0.0.4)"""
+    with _lock:
+        histograms = {stage: (list(h.buckets), h.count, h.total, h.errors) for stage, h in _histograms.items()}
+        counters = dict(_counters)
+
+    lines = [f"# HELP {METRIC_PREFIX}_stage_latency_seconds 단계별 처리 시간",
+             f"# TYPE {METRIC_PREFIX}_stage_latency_seconds histogram"]
+    for stage, (buckets, count, total, _) in sorted(histograms.items()):
+        cumulative = 0
+        for bound, n in zip(BUCKETS + ('+Inf',), buckets):
+            cumulative += n
+            lines.append(f"{METRIC_PREFIX}_stage_latency_seconds_bucket{_labels(stage=stage, le=bound)} {cumulative}")
+        lines.append(f"{METRIC_PREFIX}_stage_latency_seconds_sum{_labels(stage=stage)} {total:.6f}")
+        lines.append(f"{METRIC_PREFIX}_stage_latency_seconds_count{_labels(stage=stage)} {count}")
+
+    lines += [f"# HELP {METRIC_PREFIX}_stage_errors_total 예외로 끝난 호출 수",
+              f"# TYPE {METRIC_PREFIX}_stage_errors_total counter"]
+    for stage, (_, _, _, errors) in sorted(histograms.items()):
+        lines.append(f"{METRIC_PREFIX}_stage_errors_total{_labels(stage=stage)} {errors}")
+
+    names = sorted({name for name, _ in counters})
+    for name in names:
+        lines.append(f"# TYPE {METRIC_PREFIX}_{name}_total counter")
+        for (counter, labels), value in sorted(counters.items()):
+            if counter == name:
+                lines.append(f"{METRIC_PREFIX}_{name}_total{_labels(**dict(labels))} {value}")
+
+    caches = all_cache_stats()
+    for field, kind in (('hits', 'counter'), ('misses', 'counter'), ('coalesced', 'counter'), ('size', 'gauge')):
+        metric = f"{METRIC_PREFIX}_cache_{field}" + ('_total' if kind == 'counter' else '')
+        lines.append(f"# TYPE {metric} {kind}")
+        for stats in caches:
+            lines.append(f"{metric}{_labels(cache=stats['name'])} {stats[field]}")
+    return "\n".join(lines) + "\n"
+
+def write_prometheus(path):
+    """node_exporter textfile collector 등에서 읽을 수 있도록 파일을 원자적으로 교체합니다."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(render_prometheus())
+    os.replace(tmp_path, path)
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = render_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_http_server(port, host=METRICS_HOST):
+    """백그라운드 스레드에서 /metrics 엔드포인트를 제공합니다."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    return server
+
+def _write_periodically(path, interval):
+    while True:
+        time.sleep(interval)
+        try:
+            write_prometheus(path)
+        except OSError as e:
+            print(f"⚠️ 메트릭 파일 기록 실패: {e}")
+
+def start_exporters(port=METRICS_PORT, path=METRICS_FILE, interval=METRICS_FILE_INTERVAL, host=METRICS_HOST):
+    """설정된 노출 방식(HTTP/파일)을 프로세스당 한 번만 시작합니다. 계측이 꺼져 있으면 아무것도 하지 않습니다."""
+    global _exporters_started
+    with _lock:
+        if _exporters_started or not _enabled:
+            return
+        _exporters_started = True
+    if port:
+        start_http_server(port, host)
+    if path:
+        threading.Thread(target=_write_periodically, args=(path, interval), name='metrics-file', daemon=True).start()
@@ -0,0 +1,262 @@
+from concurrent.futures import Future
+import argparse
+import importlib
+import os
+import queue
+import shutil
+import threading
+import time
+import numpy as np
+
+MODEL_NAME = 'snunlp/KR-SBERT-V40K-klueNLI-augSTS'
+
+# CPU 추론 백엔드: 'torch'(fp32, 기본), 'int8'(torch 동적 int8 양자화), 'onnx'(ONNX Runtime, optimum[onnxruntime] 필요)
+BACKENDS = ('torch', 'int8', 'onnx')
+ENCODER_BACKEND = os.environ.get('ENCODER_BACKEND', 'torch')
+# 추론 스레드 수 (0이면 라이브러리 기본값)
+ENCODER_THREADS = int(os.environ.get('ENCODER_THREADS', 0))
+# onnx 백엔드용으로 한 번 내보낸 모델을 보관하는 디렉터리 (허브 저장소에 ONNX 파일이 없어 매번 내보내지 않도록)
+ONNX_MODEL_DIR = os.environ.get('ONNX_MODEL_DIR', '.onnx_model')
+
+# 동시에 들어온 검색어 encode 요청을 한 번의 배치로 묶는 설정
+QUERY_BATCH_SIZE = int(os.environ.get('QUERY_BATCH_SIZE', 32))
+QUERY_BATCH_WAIT_MS = float(os.environ.get('QUERY_BATCH_WAIT_MS', 5))
+
+# 앱 시작 시 백그라운드에서 모델을 미리 올려 둘지 여부 (0이면 첫 의미 기반 검색 때 로드)
+MODEL_WARMUP = os.environ.get('MODEL_WARMUP', '1') != '0'
+
+# fp32 대비 코사인 유사도 검사용 문장 (검색어와 통합텍스트 형태)
+CHECK_TEXTS = [
+    "삼성전자", "전기차 배터리", "여름철 냉방", "인공지능 소프트웨어", "반도체 장비", "바이오 신약 개발",
+    "조선 해양 플랜트", "게임 콘텐츠", "원자력 발전", "화장품 수출", "방산 무기체계",
+    "삼성전자 통신 및 방송 장비 제조업 반도체, 휴대폰, 가전제품",
+    "에코프로비엠 일차전지 및 축전지 제조업 2차전지 양극재",
+    "위닉스 가정용 기기 제조업 공기청정기, 제습기, 에어컨",
+    "셀트리온 기초 의약물질 제조업 바이오시밀러, 항체의약품",
+    "한화에어로스페이스 항공기,우주선 및 부품 제조업 항공기 엔진, 자주포, 발사체",
+    "엔씨소프트 소프트웨어 개발 및 공급업 온라인 게임 리니지",
+    "두산에너빌리티 구조용 금속제품 제조업 원자로 주기기, 가스터빈, 풍력발전기"
+]
+
+_model = None
+_model_lock = threading.Lock()
+_load_seconds = None
+_warm_up_thread = None
+_warm_up_error = None
+_query_encoder = None
+
+def onnx_model_path(model_name=MODEL_NAME):
+    return os.path.join(ONNX_MODEL_DIR, model_name.replace('/', '__'))
+
+def _load_onnx(model_kwargs):
+    """
+    ONNX로 내보낸 모델을 ONNX_MODEL_DIR에서 불러옵니다.
+    처음 한 번만 허브 모델을 내보내 임시 디렉터리에 저장한 뒤 이름을 바꿔 넣으므로 다른 프로세스가 반쯤 저장된 모델을 읽지 않습니다.
+    """
+    from sentence_transformers import SentenceTransformer
+    path = onnx_model_path()
+    if os.path.exists(os.path.join(path, 'onnx', 'model.onnx')):
+        return SentenceTransformer(path, device='cpu', backend='onnx', model_kwargs=model_kwargs)
+
+    model = SentenceTransformer(MODEL_NAME, device='cpu', backend='onnx', model_kwargs=model_kwargs)
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    model.save_pretrained(tmp_path)
+    try:
+        os.replace(tmp_path, path)
+    except OSError:
+        # 다른 프로세스가 먼저 저장한 경우
+        shutil.rmtree(tmp_path, ignore_errors=True)
+    return model
+
+def load_model(backend='torch', threads=0):
+    """
+    지정한 CPU 백엔드로 모델을 새로 불러옵니다. (캐시하지 않음, 앱에서는 get_embedding_model 사용)
+    - int8: Linear 계층 가중치를 int8로 동적 양자화 (추가 의존성 없음)
+    - onnx: sentence-transformers의 ONNX 백엔드로 내보낸 모델을 ONNX Runtime으로 실행 (내보낸 모델은 ONNX_MODEL_DIR에 저장해 재사용)
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"지원하지 않는 백엔드: {backend} (가능: {', '.join(BACKENDS)})")
+    import torch
+    from sentence_transformers import SentenceTransformer
+    if threads > 0:
+        torch.set_num_threads(threads)
+
+    if backend == 'onnx':
+        try:
+            # sentence-transformers의 ONNX 백엔드는 optimum을 통해 실행되며, optimum이 없으면 ImportError가 아닌 오류를 냄
+            importlib.import_module('optimum.onnxruntime')
+            import onnxruntime
+        except ImportError:
+            raise ImportError("onnx 백엔드를 사용하려면 'pip install optimum[onnxruntime]'이 필요합니다.") from None
+        model_kwargs = {'provider': 'CPUExecutionProvider'}
+        if threads > 0:
+            options = onnxruntime.SessionOptions()
+            options.intra_op_num_threads = threads
+            model_kwargs['session_options'] = options
+        return _load_onnx(model_kwargs)
+
+    model = SentenceTransformer(MODEL_NAME, device='cpu')
+    if backend == 'int8':
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return model
+
+def get_embedding_model():
+    """
+    ENCODER_BACKEND로 불러온 임베딩 모델을 반환합니다. 처음 호출될 때만 torch/sentence_transformers를 import 하고
+    가중치를 읽으며, 이후에는 프로세스 전역에서 같은 인스턴스를 공유합니다. (워밍업 중이면 끝날 때까지 기다림)
+    """
+    global _model, _load_seconds
+    if _model is not None:
+        return _model
+    with _model_lock:
+        if _model is None:
+            t0 = time.perf_counter()
+            _model = load_model(ENCODER_BACKEND, ENCODER_THREADS)
+            _load_seconds = time.perf_counter() - t0
+        return _model
+
+def cache_key(model_name=MODEL_NAME, backend=ENCODER_BACKEND):
+    """임베딩 캐시 구분용 이름 (백엔드마다 벡터가 조금씩 다르므로 fp32와 섞지 않음)"""
+    return model_name if backend == 'torch' else f"{model_name}@{backend}"
+
+class BatchingEncoder:
+    """
+    여러 스레드(Streamlit 세션)에서 동시에 들어온 검색어를 모아 한 번의 encode 호출로 처리합니다.
+    첫 요청 후 최대 max_wait_ms 동안 또는 max_batch개가 찰 때까지 기다렸다가 배치를 실행합니다.
+    """
+
+    def __init__(self, model_getter=get_embedding_model, max_batch=QUERY_BATCH_SIZE, max_wait_ms=QUERY_BATCH_WAIT_MS):
+        self.model_getter = model_getter
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='query-encoder', daemon=True)
+        self._thread.start()
+
+    def submit(self, text):
+        future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def encode(self, text):
+        return self.submit(text).result()
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            futures = [future for _, future in batch if future.set_running_or_notify_cancel()]
+            if not futures:
+                continue
+            texts = [text for text, future in batch if future in futures]
+            try:
+                vectors = self.model_getter().encode(texts, batch_size=len(texts))
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+            for future, vector in zip(futures, vectors):
+                future.set_result(vector)
+
+def get_query_encoder():
+    """검색어 encode용 공유 BatchingEncoder"""
+    global _query_encoder
+    if _query_encoder is None:
+        with _model_lock:
+            if _query_encoder is None:
+                _query_encoder = BatchingEncoder()
+    return _query_encoder
+
+def is_model_ready():
+    return _model is not None
+
+def _warm_up():
+    global _warm_up_error
+    try:
+        # 첫 encode 때 생기는 지연(스레드 풀/커널 초기화)까지 미리 치러 둠
+        get_embedding_model().encode("워밍업")
+    except Exception as e:
+        _warm_up_error = e
+        print(f"⚠️ 임베딩 모델 워밍업 실패: {e}")
+
+def start_warm_up():
+    """백그라운드 스레드에서 모델을 로드하고 더미 문장을 한 번 encode 합니다. 이미 시작했으면 그 스레드를 반환합니다."""
+    global _warm_up_thread
+    with _model_lock:
+        if _warm_up_thread is None and _model is None:
+            _warm_up_thread = threading.Thread(target=_warm_up, name='model-warm-up', daemon=True)
+            _warm_up_thread.start()
+        return _warm_up_thread
+
+def get_model_status():
+    """모델 로드 상태 (디버그/메트릭용)"""
+    return {
+        'model': MODEL_NAME,
+        'backend': ENCODER_BACKEND,
+        'ready': is_model_ready(),
+        'load_seconds': None if _load_seconds is None else round(_load_seconds, 3),
+        'warming_up': _warm_up_thread is not None and _warm_up_thread.is_alive(),
+        'warm_up_error': None if _warm_up_error is None else str(_warm_up_error)
+    }
+
+def row_cosine(a, b):
+    a = np.asarray(a, dtype=np.float32)
+    b = np.asarray(b, dtype=np.float32)
+    return np.sum(a * b, axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1) + 1e-12)
+
+def query_latency_ms(model, texts, repeat=3):
+    """검색어 한 건씩 encode 할 때의 평균 지연(ms)"""
+    model.encode(texts[0])
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            model.encode(text)
+    return (time.perf_counter() - t0) * 1000 / (repeat * len(texts))
+
+def check_backend(backend, threads=0, texts=CHECK_TEXTS):
+    """fp32 torch 벡터 대비 backend 벡터의 코사인 유사도(최소/평균)와 검색어 encode 지연을 비교합니다."""
+    reference = load_model('torch', threads)
+    candidate = load_model(backend, threads)
+    similarity = row_cosine(reference.encode(texts), candidate.encode(texts))
+    return {
+        'backend': backend,
+        'min_cosine': float(similarity.min()),
+        'mean_cosine': float(similarity.mean()),
+        'fp32_query_ms': query_latency_ms(reference, texts),
+        'backend_query_ms': query_latency_ms(candidate, texts)
+    }
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="임베딩 CPU 백엔드 정확도/지연 검사 (fp32 torch 대비)")
+    parser.add_argument('--check', choices=BACKENDS, nargs='+', default=['int8', 'onnx'], help="검사할 백엔드")
+    parser.add_argument('--threads', type=int, default=ENCODER_THREADS, help="추론 스레드 수 (0이면 기본값)")
+    parser.add_argument('--min-cosine', type=float, default=0.99, help="허용하는 최소 코사인 유사도")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    failed = False
+    for backend in args.check:
+        try:
+            result = check_backend(backend, args.threads)
+        except ImportError as e:
+            print(f"⏭️ {backend:<6} 건너뜀: {e}")
+            continue
+        ok = result['min_cosine'] >= args.min_cosine
+        failed = failed or not ok
+        print(f"{'✅' if ok else '❌'} {backend:<6} cosine min={result['min_cosine']:.4f} mean={result['mean_cosine']:.4f}  "
+              f"query {result['fp32_query_ms']:.1f}ms -> {result['backend_query_ms']:.1f}ms")
+    if failed:
+        raise SystemExit(1)
@@ -0,0 +1,186 @@
+from concurrent.futures import ThreadPoolExecutor
+from metrics import inc, timer
+import argparse
+import datetime
+import json
+import os
+import shutil
+import threading
+import time
+import numpy as np
+import pandas as pd
+
+STORE_DIR = os.environ.get('PRICE_STORE_DIR', '.price_store')
+
+# 마지막 조회 후 이 시간(초)이 지나기 전에는 네트워크 조회 없이 디스크 데이터만 사용
+MIN_REFRESH_SECONDS = int(os.environ.get('PRICE_STORE_REFRESH', 600))
+
+def fdr_reader(symbol, start=None, end=None):
+    """FinanceDataReader.DataReader (import가 무거우므로 처음 조회할 때 불러옴)"""
+    import FinanceDataReader as fdr
+    return fdr.DataReader(symbol, start, end)
+
+class PriceStore:
+    """
+    종목별 일봉 OHLCV를 컬럼별 NumPy 파일(.npy)로 디스크에 보관하는 저장소.
+
+    <root>/<ticker>/meta.json 이 현재 버전 디렉터리를 가리키며, 각 버전 디렉터리에는
+    Date.npy(int64 ns)와 컬럼별 숫자 배열이 있습니다. 읽기는 memory-map으로 하고,
+    쓰기는 새 버전 디렉터리를 만든 뒤 meta.json을 원자적으로 교체하므로 읽는 쪽이 깨진 데이터를 보지 않습니다.
+    """
+
+    def __init__(self, root=STORE_DIR, reader=None, min_refresh=MIN_REFRESH_SECONDS):
+        self.root = root
+        self.reader = reader or fdr_reader
+        self.min_refresh = min_refresh
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    def _lock(self, ticker):
+        with self._locks_lock:
+            return self._locks.setdefault(ticker, threading.Lock())
+
+    def _dir(self, ticker):
+        return os.path.join(self.root, ticker)
+
+    def load_meta(self, ticker):
+        path = os.path.join(self._dir(ticker), 'meta.json')
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def load(self, ticker, meta=None):
+        """디스크에 저장된 전체 일봉을 DataFrame으로 반환합니다. (없으면 빈 DataFrame)"""
+        meta = meta or self.load_meta(ticker)
+        if meta is None:
+            return pd.DataFrame()
+        version_dir = os.path.join(self._dir(ticker), meta['version'])
+        dates = np.load(os.path.join(version_dir, 'Date.npy'), mmap_mode='r')
+        data = {col: np.load(os.path.join(version_dir, f'{col}.npy'), mmap_mode='r') for col in meta['columns']}
+        index = pd.DatetimeIndex(np.asarray(dates).view('datetime64[ns]'), name='Date')
+        return pd.DataFrame(data, index=index)
+
+    def _write(self, ticker, df, meta):
+        ticker_dir = self._dir(ticker)
+        version = f"v{time.time_ns()}"
+        version_dir = os.path.join(ticker_dir, version)
+        os.makedirs(version_dir)
+
+        columns = [col for col in df.columns if pd.api.types.is_numeric_dtype(df[col])]
+        np.save(os.path.join(version_dir, 'Date.npy'), df.index.values.astype('datetime64[ns]').view('int64'))
+        for col in columns:
+            np.save(os.path.join(version_dir, f'{col}.npy'), df[col].to_numpy())
+
+        previous = meta.get('version')
+        meta = dict(meta, version=version, columns=columns)
+        tmp_path = os.path.join(ticker_dir, 'meta.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(ticker_dir, 'meta.json'))
+
+        # 직전 버전은 아직 읽는 중인 프로세스를 위해 남기고 그보다 오래된 버전만 정리
+        for name in os.listdir(ticker_dir):
+            if name.startswith('v') and name not in (version, previous):
+                shutil.rmtree(os.path.join(ticker_dir, name), ignore_errors=True)
+        return meta
+
+    def _fetch(self, ticker, start, end):
+        with timer('upstream.fdr'):
+            df = self.reader(ticker, start, end)
+        if df is None or df.empty:
+            return pd.DataFrame()
+        df.index = pd.DatetimeIndex(df.index).tz_localize(None).normalize()
+        df.index.name = 'Date'
+        return df
+
+    def get(self, ticker, start, end=None):
+        """
+        [start, end] 구간의 일봉을 반환합니다.
+        저장된 기간 밖의 과거 구간이 필요할 때만 전체를 다시 받고, 평소에는 마지막 저장일 이후의 꼬리 구간만 받습니다.
+        """
+        end = end or datetime.datetime.today()
+        start, end = pd.Timestamp(start).normalize(), pd.Timestamp(end)
+
+        with self._lock(ticker):
+            meta = self.load_meta(ticker)
+            stored = self.load(ticker, meta)
+            now = time.time()
+
+            fetched = None
+            try:
+                if meta is None or start < pd.Timestamp(meta['requested_start']):
+                    # 처음 보는 종목이거나 더 과거 구간이 필요한 경우: 전체 구간 조회
+                    fetched = self._fetch(ticker, start, end)
+                    requested_start = start
+                elif now - meta['fetched_at'] >= self.min_refresh:
+                    # 마지막 저장일(장중 미완성일 수 있음)부터 오늘까지의 꼬리만 조회
+                    tail_start = stored.index[-1] if not stored.empty else start
+                    fetched = self._fetch(ticker, tail_start, end)
+                    requested_start = pd.Timestamp(meta['requested_start'])
+            except Exception:
+                if stored.empty:
+                    raise
+                # 외부 API 오류 자체는 upstream.fdr 단계의 오류 수로 집계되며, 여기서는 이전 데이터로 응답한 횟수를 셈
+                inc('stale_fallbacks', source='fdr')
+                print(f"⚠️ {ticker} 시세 갱신 실패, 저장된 데이터를 사용합니다.")
+
+            if fetched is not None:
+                merged = pd.concat([stored, fetched]) if not stored.empty else fetched
+                merged = merged[~merged.index.duplicated(keep='last')].sort_index()
+                meta = self._write(ticker, merged, {
+                    'version': meta['version'] if meta else None,
+                    'requested_start': requested_start.strftime('%Y-%m-%d'),
+                    'fetched_at': now
+                })
+                stored = self.load(ticker, meta)
+
+        return stored.loc[start:end]
+
+    def warm_up(self, tickers, start, end=None, workers=4):
+        """여러 종목의 일봉을 미리 받아 둡니다. (종목코드 -> 저장된 행 수 또는 오류 메시지)"""
+        def _warm(ticker):
+            try:
+                return ticker, len(self.get(ticker, start, end))
+            except Exception as e:
+                return ticker, f"error: {e}"
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return dict(executor.map(_warm, tickers))
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+def get_price_store():
+    """프로세스 전역에서 공유하는 기본 PriceStore"""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = PriceStore()
+        return _default_store
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="종목별 일봉 시세를 로컬 저장소에 미리 받아 둡니다.")
+    parser.add_argument('tickers', nargs='*', help="종목코드 또는 지수 심볼 (예: 005930 KS11)")
+    parser.add_argument('--all-listed', action='store_true', help="KRX 상장법인 전체를 대상으로 함")
+    parser.add_argument('--years', type=int, default=5, help="받아 둘 기간 (년)")
+    parser.add_argument('--workers', type=int, default=4, help="동시 다운로드 수")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    tickers = list(args.tickers)
+    if args.all_listed:
+        from elastic_bulk import get_stock_info
+        tickers += get_stock_info()['종목코드'].tolist()
+    if not tickers:
+        raise SystemExit("종목코드를 입력하거나 --all-listed 옵션을 사용하세요.")
+
+    start_date = datetime.datetime.today() - datetime.timedelta(days=365 * args.years)
+    print(f"⏳ {len(tickers)}개 종목의 일봉을 저장소({STORE_DIR})에 받는 중입니다...")
+    t0 = time.perf_counter()
+    results = get_price_store().warm_up(tickers, start_date, workers=args.workers)
+    failed = {t: r for t, r in results.items() if isinstance(r, str)}
+    for ticker, reason in list(failed.items())[:10]:
+        print(f"⚠️ {ticker}: {reason}")
+    print(f"✅ 완료: {len(results) - len(failed)}개 성공, {len(failed)}개 실패 ({time.perf_counter() - t0:.1f}초)")
@@ -0,0 +1,112 @@
+from cache_utils import LRUCache
+from price_store import get_price_store
+from metrics import timer
+import datetime
+import threading
+import numpy as np
+import pandas as pd
+
+# 차트 주기별 리샘플링 규칙과 표시 기간
+RULES = {'주봉': 'W-FRI', '월봉': 'ME'}
+PERIODS = {'주봉': 'W-FRI', '월봉': 'M'}
+WINDOW_DAYS = {'월봉': 365 * 5, '주봉': 365 * 2, '일봉': 365}
+HISTORY_DAYS = max(WINDOW_DAYS.values())
+
+OHLCV_AGG = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
+MA_WINDOWS = (5, 20, 60)
+
+def add_moving_averages(df, start_pos=0):
+    """start_pos 이후 행의 이동평균(MA5/20/60)만 다시 계산합니다. 앞부분은 기존 값을 그대로 둡니다."""
+    close = df['Close'].to_numpy(dtype=np.float64)
+    for window in MA_WINDOWS:
+        col = f'MA{window}'
+        if col not in df.columns:
+            df[col] = np.nan
+            pos = 0
+        else:
+            pos = start_pos
+        lo = max(0, pos - window + 1)
+        ma = pd.Series(close[lo:]).rolling(window=window).mean().to_numpy()
+        df.iloc[pos:, df.columns.get_loc(col)] = ma[pos - lo:]
+    return df
+
+def period_bounds(date, timeframe):
+    """date가 속한 주기의 (시작일, 라벨). 라벨은 resample과 같은 주 금요일/월말입니다."""
+    period = pd.Timestamp(date).to_period(PERIODS[timeframe])
+    return period.start_time.normalize(), period.end_time.normalize()
+
+def resample_bars(daily, timeframe):
+    return daily.resample(RULES[timeframe]).agg(OHLCV_AGG).dropna()
+
+class RollupEngine:
+    """
+    종목별 일봉 한 벌로 주봉/월봉을 만들고, 새 일봉이 들어오면 마지막(미완성) 봉부터만 다시 집계합니다.
+    이동평균도 주기별로 함께 보관하므로 차트 주기를 바꿔도 다시 계산하거나 다시 받지 않습니다.
+    """
+
+    def __init__(self, store=None, max_tickers=128):
+        self.store = store
+        self._states = LRUCache(maxsize=max_tickers, name='rollup')
+        self._lock = threading.Lock()
+
+    def _build(self, daily):
+        bars = {'일봉': add_moving_averages(daily.copy())}
+        for timeframe in RULES:
+            bars[timeframe] = add_moving_averages(resample_bars(daily, timeframe))
+        return {'daily': daily, 'bars': bars}
+
+    def _extend(self, state, daily, changed_from):
+        """changed_from 일자가 속한 봉부터 끝까지만 다시 집계합니다."""
+        bars = state['bars']
+
+        old_daily = bars['일봉']
+        keep = int(old_daily.index.searchsorted(changed_from))
+        tail = daily.loc[changed_from:].copy()
+        merged = pd.concat([old_daily.iloc[:keep], tail])
+        bars['일봉'] = add_moving_averages(merged, keep)
+
+        for timeframe in RULES:
+            start, label = period_bounds(changed_from, timeframe)
+            old_bars = bars[timeframe]
+            keep = int(old_bars.index.searchsorted(label))
+            tail = resample_bars(daily.loc[start:], timeframe)
+            bars[timeframe] = add_moving_averages(pd.concat([old_bars.iloc[:keep], tail]), keep)
+
+        state['daily'] = daily
+        return state
+
+    def update(self, ticker, daily):
+        """저장소에서 읽은 일봉과 보관 중인 상태를 비교해 바뀐 부분만 반영합니다."""
+        with self._lock:
+            state = self._states.get(ticker)
+            if daily.empty:
+                state = {'daily': daily, 'bars': {tf: daily for tf in WINDOW_DAYS}}
+            elif state is None or state['daily'].empty or daily.index[0] < state['daily'].index[0]:
+                # 처음이거나 보관 중인 것보다 과거 구간이 더 필요하면 전체 집계
+                state = self._build(daily)
+            else:
+                old = state['daily']
+                last = old.index[-1]
+                if daily.index[-1] == last and daily.iloc[-1].equals(old.iloc[-1]):
+                    return state
+                # 마지막 저장일은 장중 미완성 값이었을 수 있으므로 그 날짜부터 다시 반영
+                state = self._extend(state, daily, last)
+            self._states.set(ticker, state)
+            return state
+
+    def get(self, ticker, timeframe, end=None):
+        """표시 기간(WINDOW_DAYS)으로 자른 봉 데이터 (이동평균 컬럼 포함)"""
+        end = end or datetime.datetime.today()
+        store = self.store or get_price_store()
+        daily = store.get(ticker, end - datetime.timedelta(days=HISTORY_DAYS), end)
+        with timer('rollup.update'):
+            bars = self.update(ticker, daily)['bars'][timeframe]
+        if bars.empty:
+            return bars.copy()
+        window_start = pd.Timestamp(end - datetime.timedelta(days=WINDOW_DAYS[timeframe])).normalize()
+        return bars.loc[window_start:].copy()
+
+_default_engine = RollupEngine()
+
+def get_rollup_engine():
+    return _default_engine
@@ -1,41 +1,89 @@
-import FinanceDataReader as fdr
-from pykrx import stock
-import yfinance as yf
+from market_snapshot import get_market_snapshot
+from price_store import get_price_store
+from rollup import add_moving_averages, get_rollup_engine
+from intraday_store import get_intraday_store
+from cache_utils import LRUCache
+from metrics import timed
 import datetime
+import functools
+import os
 import pandas as pd
 
+# 외부 시세 호출 결과 공유 캐시: 장중(평일 09:00~15:30 KST)에는 짧게, 장 마감 후/주말에는 길게 보관
+KST = datetime.timezone(datetime.timedelta(hours=9))
+MARKET_OPEN = datetime.time(9, 0)
+MARKET_CLOSE = datetime.time(15, 30)
+UPSTREAM_TTL_OPEN = int(os.environ.get('UPSTREAM_TTL_OPEN', 60))
+UPSTREAM_TTL_CLOSED = int(os.environ.get('UPSTREAM_TTL_CLOSED', 3600))
+UPSTREAM_CACHE_SIZE = int(os.environ.get('UPSTREAM_CACHE_SIZE', 512))
+
+_upstream_cache = LRUCache(UPSTREAM_CACHE_SIZE, name='upstream')
+
+def is_market_open(now=None):
+    now = now or datetime.datetime.now(KST)
+    return now.weekday() < 5 and MARKET_OPEN <= now.time() < MARKET_CLOSE
+
+def market_ttl(now=None):
+    """현재 시각 기준 캐시 유지 시간(초). 개장 전에는 개장 시각을 넘기지 않습니다."""
+    now = now or datetime.datetime.now(KST)
+    if is_market_open(now):
+        return UPSTREAM_TTL_OPEN
+    if now.weekday() < 5 and now.time() < MARKET_OPEN:
+        until_open = (datetime.datetime.combine(now.date(), MARKET_OPEN, tzinfo=KST) - now).total_seconds()
+        return max(1, min(UPSTREAM_TTL_CLOSED, int(until_open)))
+    return UPSTREAM_TTL_CLOSED
+
+def cached_upstream(func):
+    """
+    (함수, 인자, 거래일) 단위로 결과를 프로세스 전역에서 공유합니다.
+    같은 요청이 동시에 들어오면 외부 API는 한 번만 호출되고 나머지 세션은 그 결과를 기다립니다.
+    빈 결과는 일시적인 오류일 수 있으므로 장중 TTL만큼만 보관합니다.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        now = datetime.datetime.now(KST)
+        key = (func.__name__, args, tuple(sorted(kwargs.items())), now.strftime('%Y%m%d'))
+        ttl = market_ttl(now)
+        value = _upstream_cache.get_or_load(
+            key, lambda: func(*args, **kwargs),
+            ttl=lambda v: min(ttl, UPSTREAM_TTL_OPEN) if isinstance(v, pd.DataFrame) and v.empty else ttl
+        )
+        # 여러 세션이 같은 객체를 받으므로 DataFrame은 복사본을 돌려줌
+        return value.copy() if isinstance(value, pd.DataFrame) else value
+    return wrapper
+
+def get_upstream_cache_stats():
+    """외부 시세 캐시의 적중/미스/합쳐진(coalesced) 요청 수"""
+    return _upstream_cache.stats()
+
+def clear_upstream_cache():
+    _upstream_cache.clear()
+
+@timed()
 def get_stock_price_data(ticker, timeframe='월봉', market='유가'):
-    """선택한 주기에 맞춰 주가 데이터를 가져오고 리샘플링합니다."""
-    end_date = datetime.datetime.today()
-    
-    if timeframe == '월봉':
-        start_date = end_date - datetime.timedelta(days=365 * 5) # 월봉은 최근 5년치
-        df = fdr.DataReader(ticker, start_date, end_date)
-        if not df.empty:
-            # Pandas 최신 버전 권장에 따라 'ME' (Month End) 사용, 구버전은 'M'
-            df = df.resample('ME').agg({'Open':'first', 'High':'max', 'Low':'min', 'Close':'last', 'Volume':'sum'}).dropna()
-            
-    elif timeframe == '주봉':
-        start_date = end_date - datetime.timedelta(days=365 * 2) # 주봉은 최근 2년치
-        df = fdr.DataReader(ticker, start_date, end_date)
-        if not df.empty:
-            df = df.resample('W-FRI').agg({'Open':'first', 'High':'max', 'Low':'min', 'Close':'last', 'Volume':'sum'}).dropna()
-            
-    elif timeframe == '일봉':
-        start_date = end_date - datetime.timedelta(days=365) # 일봉은 최근 1년치
-        df = fdr.DataReader(ticker, start_date, end_date)
-        
+    """선택한 주기에 맞춰 주가 데이터(이동평균 MA5/20/60 포함)를 가져옵니다."""
+    if timeframe in ('월봉', '주봉', '일봉'):
+        # 일봉 한 벌(로컬 시세 저장소)에서 주봉/월봉을 증분 집계하므로 주기를 바꿔도 다시 받거나 다시 계산하지 않음
+        # 표시 기간: 월봉 5년, 주봉 2년, 일봉 1년
+        return get_daily_based_bars(ticker, timeframe)
+
     elif timeframe == '분봉':
-        # 분봉은 yfinance를 활용 (최근 7일치, 1분 간격)
-        suffix = ".KS" if "유가" in market else ".KQ"
-        yf_ticker = f"{ticker}{suffix}"
-        df = yf.download(yf_ticker, period="7d", interval="1m")
-        # yfinance 최신 버전의 MultiIndex 컬럼 평탄화
-        if not df.empty and isinstance(df.columns, pd.MultiIndex):
-            df.columns = df.columns.get_level_values(0)
-            
-    return df
+        # 분봉은 종목별 링 버퍼(최근 7일, 1분 간격)에 보관하고, 다시 볼 때는 마지막 봉 이후의 새 봉만 yfinance에서 받음
+        # 저장소가 자체 갱신 주기와 종목별 잠금으로 중복 조회를 막으므로 공유 캐시는 거치지 않음 (자동 갱신이 지연되지 않도록)
+        df = get_intraday_store().get(ticker, market)
+        if not df.empty:
+            df = add_moving_averages(df)
+        return df
 
+    return pd.DataFrame()
+
+@cached_upstream
+def get_daily_based_bars(ticker, timeframe):
+    """일봉/주봉/월봉 (종목, 주기, 거래일 단위로 공유 캐시)"""
+    return get_rollup_engine().get(ticker, timeframe)
+
+@timed()
+@cached_upstream
 def get_market_index(market_name):
     """코스닥, 코넥스, 유가 지수 조회"""
     end_date = datetime.datetime.today()
@@ -49,39 +97,23 @@ def get_market_index(market_name):
         # 코넥스 지수(KNX)는 무료 API 지원이 제한적이므로 우선 코스닥으로 매핑하거나 빈 데이터프레임 반환
         symbol = "KQ11" 
         
-    return fdr.DataReader(symbol, start_date, end_date)
+    return get_price_store().get(symbol, start_date, end_date)
 
+@timed()
 def get_today_market_ranking():
-    # 최근 5일 중 데이터가 존재하는 가장 최근 영업일 찾기
-    df = pd.DataFrame()
-    for i in range(5):
-        target_date = (datetime.datetime.today() - datetime.timedelta(days=i)).strftime("%Y%m%d")
-        temp_df = stock.get_market_ohlcv(target_date, market="KOSPI")
-        if not temp_df.empty:
-            df = temp_df
-            break
+    # 최근 영업일의 코스피 스냅샷은 프로세스 전역에서 공유되며 순위는 미리 정렬되어 있음
+    snapshot = get_market_snapshot("KOSPI")
 
-    df = df.reset_index()
-    df['종목명'] = df['티커'].apply(lambda x: stock.get_market_ticker_name(x))
-    
-    top_volume = df.sort_values(by='거래량', ascending=False).head(10)[['종목명', '종가', '거래량']]
-    top_gainers = df.sort_values(by='등락률', ascending=False).head(10)[['종목명', '종가', '등락률']]
-    top_losers = df.sort_values(by='등락률', ascending=True).head(10)[['종목명', '종가', '등락률']]
+    top_volume = snapshot.top('거래량', 10)
+    top_gainers = snapshot.top('등락률', 10)
+    top_losers = snapshot.top('등락률', 10, ascending=True)
     
     return top_volume, top_gainers, top_losers
 
+@timed()
+@cached_upstream
 def get_stock_volume_rank(ticker):
-    df = pd.DataFrame()
-    for i in range(5):
-        target_date = (datetime.datetime.today() - datetime.timedelta(days=i)).strftime("%Y%m%d")
-        temp_df = stock.get_market_ohlcv(target_date, market="ALL")
-        if not temp_df.empty:
-            df = temp_df
-            break
-
-    if df.empty: return None, 0
-    df = df.sort_values(by='거래량', ascending=False).reset_index()
-    if ticker in df['티커'].values:
-        rank = df[df['티커'] == ticker].index[0] + 1
-        return rank, len(df)
-    return None, len(df)
\ No newline at end of file
+    # 전체 시장 스냅샷은 영업일마다 한 번만 받아 두고, 종목별 순위는 미리 계산된 배열에서 조회
+    snapshot = get_market_snapshot("ALL", with_names=False)
+    if len(snapshot) == 0: return None, 0
+    return snapshot.get_volume_rank(ticker)
\ No newline at end of file
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 앱 모듈은 패키지가 아니라 이 디렉터리의 평면 모듈이므로 import 경로에 추가
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
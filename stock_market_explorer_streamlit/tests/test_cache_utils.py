@@ -0,0 +1,28 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from cache_utils import LRUCache
+
+def test_get_or_load_coalesces_concurrent_loads():
+    cache = LRUCache(maxsize=4)
+    calls = []
+    release = threading.Event()
+
+    def loader():
+        calls.append(1)
+        release.wait(5)
+        return 'value'
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        futures = [executor.submit(cache.get_or_load, 'key', loader) for _ in range(8)]
+        # 나머지 스레드가 모두 진행 중인 조회를 기다리게 된 뒤 loader를 끝냄
+        deadline = time.monotonic() + 5
+        while cache.coalesced < 7 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        release.set()
+        assert [f.result() for f in futures] == ['value'] * 8
+
+    stats = cache.stats()
+    assert len(calls) == 1
+    assert (stats['misses'], stats['hits'], stats['coalesced']) == (1, 7, 7)
+    assert cache.get_or_load('key', loader) == 'value' and cache.stats()['hits'] == 8
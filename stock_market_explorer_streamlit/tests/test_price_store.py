@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+from price_store import PriceStore
+
+END = pd.Timestamp('2024-06-28')
+
+class FakeReader:
+    """호출 인자를 기록하고 [start, end] 구간의 영업일 일봉을 돌려주는 시세 조회 대역"""
+
+    def __init__(self):
+        self.calls = []
+        self.error = None
+
+    def __call__(self, ticker, start, end):
+        self.calls.append((ticker, pd.Timestamp(start), pd.Timestamp(end)))
+        if self.error is not None:
+            raise self.error
+        index = pd.bdate_range(start, end, name='Date')
+        close = np.arange(len(index), dtype=np.float64) + len(self.calls) * 1000
+        return pd.DataFrame({'Open': close, 'High': close, 'Low': close, 'Close': close, 'Volume': close}, index=index)
+
+@pytest.fixture
+def reader():
+    return FakeReader()
+
+def make_store(tmp_path, reader, min_refresh=0):
+    return PriceStore(root=str(tmp_path), reader=reader, min_refresh=min_refresh)
+
+def test_first_fetch_reads_full_range(tmp_path, reader):
+    df = make_store(tmp_path, reader).get('005930', '2024-06-03', END)
+    assert reader.calls == [('005930', pd.Timestamp('2024-06-03'), END)]
+    assert df.index[0] == pd.Timestamp('2024-06-03') and df.index[-1] == END
+    assert len(df) == len(pd.bdate_range('2024-06-03', END))
+
+def test_refetch_reads_only_tail(tmp_path, reader):
+    store = make_store(tmp_path, reader)
+    store.get('005930', '2024-06-03', '2024-06-20')
+    df = store.get('005930', '2024-06-03', END)
+
+    # 두 번째 조회는 마지막 저장일(미완성일 수 있음)부터만 요청
+    assert reader.calls[1][1] == pd.Timestamp('2024-06-20')
+    assert df.index[-1] == END
+    assert not df.index.duplicated().any()
+    # 마지막 저장일은 새로 받은 값으로 덮어씀
+    assert df.loc['2024-06-20', 'Close'] >= 2000
+
+def test_min_refresh_skips_network(tmp_path, reader):
+    make_store(tmp_path, reader).get('005930', '2024-06-03', END)
+    df = make_store(tmp_path, reader, min_refresh=3600).get('005930', '2024-06-10', END)
+    assert len(reader.calls) == 1
+    assert df.index[0] == pd.Timestamp('2024-06-10')
+
+def test_older_start_refetches_full_range(tmp_path, reader):
+    store = make_store(tmp_path, reader, min_refresh=3600)
+    store.get('005930', '2024-06-10', END)
+    df = store.get('005930', '2024-05-01', END)
+
+    assert reader.calls[1][1:] == (pd.Timestamp('2024-05-01'), END)
+    assert df.index[0] == pd.Timestamp('2024-05-01')
+    assert store.load_meta('005930')['requested_start'] == '2024-05-01'
+
+def test_reader_error_falls_back_to_stored(tmp_path, reader):
+    store = make_store(tmp_path, reader)
+    stored = store.get('005930', '2024-06-03', END)
+
+    reader.error = ConnectionError('upstream down')
+    df = store.get('005930', '2024-06-03', END)
+    assert len(reader.calls) == 2
+    pd.testing.assert_frame_equal(df, stored)
+
+    # 저장된 데이터가 없는 종목은 오류를 그대로 전달
+    with pytest.raises(ConnectionError):
+        store.get('000660', '2024-06-03', END)
@@ -0,0 +1,66 @@
+import datetime
+import numpy as np
+import pandas as pd
+import pytest
+import theme_index
+from theme_index import ThemeIndex, align, build_theme_index, correlation_matrix, daily_returns, forward_fill
+
+class FakeStore:
+    """종목코드 -> DataFrame 을 돌려주고, 없는 종목은 조회 실패로 처리하는 시세 저장소 대역"""
+
+    def __init__(self, frames):
+        self.frames = frames
+
+    def get(self, ticker, start, end=None):
+        if ticker not in self.frames:
+            raise ConnectionError(f"{ticker} 조회 실패")
+        return self.frames[ticker]
+
+def make_frame(closes, start='2024-01-02'):
+    index = pd.bdate_range(start, periods=len(closes), name='Date')
+    closes = np.asarray(closes, dtype=np.float64)
+    return pd.DataFrame({'Close': closes, 'Volume': np.full(len(closes), 1000.0)}, index=index)
+
+def test_all_fetches_failed(monkeypatch):
+    monkeypatch.setattr(theme_index, 'get_price_store', lambda: FakeStore({}))
+    theme = build_theme_index(['fail-a', 'fail-b'], end=datetime.datetime(2024, 6, 28))
+
+    assert len(theme) == 0
+    assert set(theme.errors) == {'fail-a', 'fail-b'}
+    assert len(theme.values) == 0 and theme.constituents_frame().empty
+
+def test_empty_alignment():
+    theme = ThemeIndex(*align({}, ['a']))
+    assert len(theme) == 0
+    assert theme.correlation.shape == (0, 0)
+
+def test_single_ticker():
+    frames = {'a': make_frame([100, 110, 99, 108.9])}
+    theme = ThemeIndex(*align(frames))
+
+    assert len(theme) == 1
+    np.testing.assert_allclose(theme.values, [100, 110, 99, 108.9])
+    np.testing.assert_allclose(theme.constituent_returns, [0.089])
+    assert np.isnan(theme.constituents_frame()['평균 상관계수'][0])
+
+def test_forward_fill_matches_pandas():
+    matrix = np.array([[np.nan, 1.0], [2.0, np.nan], [np.nan, np.nan], [4.0, 5.0]])
+    expected = pd.DataFrame(matrix).ffill().to_numpy()
+    np.testing.assert_array_equal(forward_fill(matrix), expected)
+
+def test_correlation_matches_pandas():
+    rng = np.random.default_rng(0)
+    closes = 100 * np.cumprod(1 + rng.normal(0, 0.02, size=(60, 4)), axis=0)
+    closes[:15, 2] = np.nan          # 늦게 상장한 종목
+    closes[30:35, 3] = np.nan        # 거래정지 구간
+    returns = daily_returns(closes)
+
+    expected = pd.DataFrame(returns).corr(min_periods=20).to_numpy()
+    np.testing.assert_allclose(correlation_matrix(returns, min_periods=20), expected, atol=1e-9)
+
+@pytest.mark.parametrize('weighting', ['equal', 'volume'])
+def test_index_values_start_at_base(weighting):
+    frames = {'a': make_frame([10, 11, 12]), 'b': make_frame([20, 19, 21])}
+    theme = ThemeIndex(*align(frames), weighting=weighting)
+    assert theme.values[0] == pytest.approx(100.0)
+    assert len(theme.values) == 3
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+from vector_index import DTYPES, LocalVectorIndex, check_parity, current_version
+
+@pytest.fixture(scope='module')
+def parity():
+    return check_parity(n=2700, queries=50, k=10)
+
+@pytest.mark.parametrize('dtype, min_recall', [('float32', 0.99), ('float16', 0.99), ('int8', 0.95)])
+def test_recall_parity(parity, dtype, min_recall):
+    assert set(parity) == set(DTYPES)
+    assert parity[dtype] >= min_recall
+
+def make_index(rows, seed):
+    vectors = np.random.default_rng(seed).normal(size=(rows, 16)).astype(np.float32)
+    ids = [f"{i:06}" for i in range(rows)]
+    return LocalVectorIndex.from_arrays(vectors, ids, [{'종목코드': i} for i in ids])
+
+def test_save_swaps_versions(tmp_path):
+    path = str(tmp_path / 'stock_info')
+    make_index(10, 0).save(path)
+    first = LocalVectorIndex.load(path)
+    assert first.version == current_version(path)
+
+    make_index(20, 1).save(path)
+    second = LocalVectorIndex.load(path)
+    assert second.version != first.version
+    assert len(second) == 20
+    # 직전 버전은 아직 열고 있는 프로세스를 위해 남음
+    assert len(first) == 10 and first.top_k(np.ones(16), 3)[0].shape == (3,)
+
+    make_index(5, 2).save(path)
+    versions = [name for name in (tmp_path / 'stock_info').iterdir() if name.is_dir()]
+    assert len(versions) == 2
@@ -0,0 +1,193 @@
+from concurrent.futures import ThreadPoolExecutor
+from cache_utils import LRUCache
+from metrics import timed, timer
+from price_store import get_price_store
+import datetime
+import os
+import numpy as np
+import pandas as pd
+
+# 테마 구성 종목 시세 조회 동시 실행 수 (종목 수가 수백 개여도 외부 API 동시 호출은 이 값으로 제한)
+THEME_WORKERS = int(os.environ.get('THEME_WORKERS', 8))
+THEME_DAYS = 365
+WEIGHTINGS = ('equal', 'volume')
+BASE_VALUE = 100.0
+
+_theme_cache = LRUCache(maxsize=32, ttl=600, name='theme_index')
+
+@timed()
+def fetch_daily(tickers, start, end=None, workers=THEME_WORKERS, store=None):
+    """
+    여러 종목의 일봉을 제한된 스레드 풀로 동시에 조회합니다. (로컬 시세 저장소를 거치므로 이미 받아 둔 종목은 디스크에서 읽음)
+    반환: (종목코드 -> DataFrame, 종목코드 -> 오류 메시지)
+    """
+    store = store or get_price_store()
+
+    def _get(ticker):
+        try:
+            return ticker, store.get(ticker, start, end), None
+        except Exception as e:
+            return ticker, None, str(e)
+
+    frames, errors = {}, {}
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(tickers)))) as executor:
+        for ticker, df, error in executor.map(_get, tickers):
+            if error is not None:
+                errors[ticker] = error
+            elif df is not None and not df.empty:
+                frames[ticker] = df
+    return frames, errors
+
+def forward_fill(matrix):
+    """열마다 NaN을 직전 값으로 채웁니다. (거래정지 등으로 비는 날, 첫 값 이전은 NaN 유지)"""
+    valid = ~np.isnan(matrix)
+    rows = np.where(valid, np.arange(len(matrix))[:, None], 0)
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    filled = matrix[rows, np.arange(matrix.shape[1])]
+    filled[~np.maximum.accumulate(valid, axis=0)] = np.nan
+    return filled
+
+def align(frames, tickers=None):
+    """
+    종목별 일봉을 전체 거래일 축에 맞춘 2차원 배열로 정렬합니다.
+    반환: (거래일 DatetimeIndex, 종목코드 목록, 종가 (일수 x 종목수), 거래량 (일수 x 종목수))
+    """
+    tickers = [t for t in (tickers or frames) if t in frames]
+    if not tickers:
+        return pd.DatetimeIndex([]), [], np.empty((0, 0)), np.empty((0, 0))
+
+    date_arrays = [frames[t].index.values.astype('datetime64[ns]').view('int64') for t in tickers]
+    dates = np.unique(np.concatenate(date_arrays))
+    closes = np.full((len(dates), len(tickers)), np.nan)
+    volumes = np.zeros((len(dates), len(tickers)))
+    for col, (ticker, stamps) in enumerate(zip(tickers, date_arrays)):
+        rows = np.searchsorted(dates, stamps)
+        closes[rows, col] = frames[ticker]['Close'].to_numpy(dtype=np.float64)
+        if 'Volume' in frames[ticker].columns:
+            volumes[rows, col] = frames[ticker]['Volume'].to_numpy(dtype=np.float64)
+    index = pd.DatetimeIndex(dates.view('datetime64[ns]'), name='Date')
+    return index, tickers, forward_fill(closes), np.nan_to_num(volumes)
+
+def daily_returns(closes):
+    """일간 수익률 (첫 행은 NaN, 상장 전/데이터 없는 구간도 NaN)"""
+    returns = np.full(closes.shape, np.nan)
+    if len(closes) > 1:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns[1:] = closes[1:] / closes[:-1] - 1
+    returns[~np.isfinite(returns)] = np.nan
+    return returns
+
+def index_weights(closes, volumes, weighting='equal'):
+    """
+    t일 수익률에 적용할 가중치. volume 가중은 전일 거래대금(종가 x 거래량) 비중을 사용해 당일 정보를 미리 쓰지 않습니다.
+    """
+    if weighting not in WEIGHTINGS:
+        raise ValueError(f"지원하지 않는 가중 방식: {weighting}")
+    weights = np.zeros(closes.shape)
+    if weighting == 'equal':
+        weights[:] = 1.0
+    elif len(closes) > 1:
+        weights[1:] = np.nan_to_num(closes[:-1] * volumes[:-1])
+    return weights
+
+def theme_index_values(returns, weights, base=BASE_VALUE):
+    """가중 평균 일간 수익률을 누적한 테마 지수 (첫날 = base)"""
+    valid = ~np.isnan(returns)
+    w = np.where(valid, weights, 0.0)
+    total = w.sum(axis=1)
+    with np.errstate(invalid='ignore'):
+        mean_return = np.where(total > 0, (np.nan_to_num(returns) * w).sum(axis=1) / np.where(total > 0, total, 1), 0.0)
+    return base * np.cumprod(1 + mean_return)
+
+def period_returns(closes):
+    """종목별 기간 수익률 (첫 유효 종가 대비 마지막 종가)"""
+    if closes.size == 0:
+        # 시세를 받은 종목이 없거나 거래일이 없으면 argmax를 계산할 수 없으므로 종목 수만큼 NaN
+        return np.full(closes.shape[1], np.nan)
+    valid = ~np.isnan(closes)
+    has_data = valid.any(axis=0)
+    first_row = np.argmax(valid, axis=0)
+    cols = np.arange(closes.shape[1])
+    first = closes[first_row, cols]
+    last = closes[-1, cols]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = last / first - 1
+    result[~has_data] = np.nan
+    return result
+
+def correlation_matrix(returns, min_periods=20):
+    """
+    결측을 제외한 쌍별(pairwise) 피어슨 상관계수 행렬. 행렬 곱으로 모든 쌍을 한 번에 계산합니다.
+    공통 관측일이 min_periods보다 적은 쌍은 NaN
+    """
+    mask = (~np.isnan(returns)).astype(np.float64)
+    x = np.nan_to_num(returns)
+    n = mask.T @ mask                   # 쌍별 공통 관측 수
+    sx = x.T @ mask                     # [i, j]: j도 관측된 날의 i 합
+    sxx = (x * x).T @ mask
+    sxy = x.T @ x
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = sxy - sx * sx.T / n
+        var_i = sxx - sx * sx / n
+        corr = cov / np.sqrt(var_i * var_i.T)
+    corr[n < min_periods] = np.nan
+    np.fill_diagonal(corr, np.where(np.diag(n) >= min_periods, 1.0, np.nan))
+    return np.clip(corr, -1.0, 1.0)
+
+class ThemeIndex:
+    """테마 구성 종목의 정렬된 시세와 지수/수익률/상관계수 계산 결과"""
+
+    def __init__(self, dates, tickers, closes, volumes, weighting='equal', names=None, errors=None):
+        self.dates = dates
+        self.tickers = tickers
+        self.names = names or {}
+        self.errors = errors or {}
+        self.weighting = weighting
+        self.closes = closes
+        self.volumes = volumes
+        self.returns = daily_returns(closes)
+        self.values = theme_index_values(self.returns, index_weights(closes, volumes, weighting))
+        self.constituent_returns = period_returns(closes)
+        self.correlation = correlation_matrix(self.returns)
+
+    def __len__(self):
+        return len(self.tickers)
+
+    def labels(self):
+        return [self.names.get(t, t) for t in self.tickers]
+
+    def index_frame(self):
+        return pd.DataFrame({'Close': self.values}, index=self.dates)
+
+    def constituents_frame(self):
+        """종목별 기간 수익률과 테마 내 평균 상관계수 (수익률 내림차순)"""
+        with np.errstate(invalid='ignore'):
+            corr = np.where(np.eye(len(self.tickers), dtype=bool), np.nan, self.correlation)
+            avg_corr = np.nanmean(corr, axis=1) if len(self.tickers) > 1 else np.full(len(self.tickers), np.nan)
+        df = pd.DataFrame({
+            '종목코드': self.tickers,
+            '회사명': self.labels(),
+            '기간 수익률(%)': np.round(self.constituent_returns * 100, 2),
+            '평균 상관계수': np.round(avg_corr, 3)
+        })
+        return df.sort_values('기간 수익률(%)', ascending=False, na_position='last').reset_index(drop=True)
+
+@timed()
+def build_theme_index(tickers, names=None, weighting='equal', days=THEME_DAYS, end=None, workers=THEME_WORKERS):
+    """
+    tickers 종목들로 테마 지수를 만듭니다. 같은 종목 구성/가중 방식은 10분 동안 재사용합니다.
+    names: 종목코드 -> 회사명 (표시용)
+    """
+    end = end or datetime.datetime.today()
+    tickers = list(dict.fromkeys(tickers))
+    key = (tuple(tickers), weighting, days, end.strftime('%Y%m%d'))
+    theme = _theme_cache.get(key)
+    if theme is not None:
+        return theme
+
+    frames, errors = fetch_daily(tickers, end - datetime.timedelta(days=days), end, workers=workers)
+    with timer('theme_index.compute'):
+        dates, aligned, closes, volumes = align(frames, tickers)
+        theme = ThemeIndex(dates, aligned, closes, volumes, weighting, names=names, errors=errors)
+    _theme_cache.set(key, theme)
+    return theme
@@ -0,0 +1,214 @@
+import argparse
+import json
+import os
+import shutil
+import time
+import numpy as np
+
+DTYPES = ('float32', 'float16', 'int8')
+
+# 질의 한 번에 float32로 변환하는 행 수 (양자화된 행렬을 통째로 복사하지 않도록 블록 단위 계산)
+BLOCK_ROWS = 65536
+
+def normalize(matrix):
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+def quantize(matrix, dtype='float32'):
+    """정규화된 행렬을 (저장 행렬, 행별 스케일)로 변환합니다. int8은 행마다 대칭 스케일을 사용합니다."""
+    if dtype == 'float32':
+        return matrix.astype(np.float32), None
+    if dtype == 'float16':
+        return matrix.astype(np.float16), None
+    if dtype == 'int8':
+        scales = np.abs(matrix).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        quantized = np.round(matrix / scales[:, None]).astype(np.int8)
+        return quantized, scales.astype(np.float32)
+    raise ValueError(f"지원하지 않는 dtype입니다: {dtype} (가능: {', '.join(DTYPES)})")
+
+def _replace_npy(path, array):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.save(f, array)
+    os.replace(tmp_path, path)
+
+def current_version(path):
+    """path에 저장된 색인의 현재 버전 (current.json이 없으면 None)"""
+    try:
+        with open(os.path.join(path, 'current.json'), encoding='utf-8') as f:
+            return json.load(f)['version']
+    except (OSError, ValueError, KeyError):
+        return None
+
+class LocalVectorIndex:
+    """
+    Elasticsearch kNN 대신 메모리 안에서 코사인 유사도 검색을 수행하는 벡터 색인.
+    save()로 저장한 파일은 load() 시 memory-map으로 열리므로 여러 Streamlit 워커 프로세스가 복사 없이 공유합니다.
+    """
+
+    def __init__(self, vectors, ids, sources, scales=None, index_name='stock_info'):
+        self.vectors = vectors
+        self.scales = scales
+        self.ids = list(ids)
+        self.sources = sources
+        self.index_name = index_name
+        self.version = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def dtype(self):
+        return self.vectors.dtype.name
+
+    @classmethod
+    def build(cls, records, dtype='float32', index_name='stock_info', id_field='종목코드', vector_field='text_vector'):
+        """elastic_bulk.iter_records()가 만드는 레코드(딕셔너리)로부터 색인을 만듭니다."""
+        ids, sources, vectors = [], [], []
+        for row in records:
+            row = dict(row)
+            vectors.append(row.pop(vector_field))
+            ids.append(str(row.get(id_field, len(ids))))
+            sources.append(row)
+        return cls.from_arrays(np.asarray(vectors, dtype=np.float32), ids, sources, dtype=dtype, index_name=index_name)
+
+    @classmethod
+    def from_arrays(cls, vectors, ids, sources, dtype='float32', index_name='stock_info'):
+        """이미 (N, dims) 행렬로 가지고 있는 벡터로 색인을 만듭니다."""
+        matrix, scales = quantize(normalize(vectors), dtype)
+        return cls(matrix, ids, sources, scales=scales, index_name=index_name)
+
+    def save(self, path):
+        """
+        path/<버전>/ 디렉터리에 벡터/스케일/메타데이터를 모두 쓴 뒤 path/current.json 하나만 원자적으로 교체합니다.
+        읽는 쪽은 항상 같은 버전의 파일 묶음을 보며, 실행 중인 앱은 current_version()이 바뀐 것을 보고 다시 불러옵니다.
+        직전 버전은 아직 memory-map으로 열고 있는 프로세스를 위해 남기고 그보다 오래된 버전만 지웁니다.
+        """
+        os.makedirs(path, exist_ok=True)
+        previous = current_version(path)
+        version = f"v{time.time_ns()}"
+        version_dir = os.path.join(path, version)
+        os.makedirs(version_dir)
+        _replace_npy(os.path.join(version_dir, 'vectors.npy'), self.vectors)
+        if self.scales is not None:
+            _replace_npy(os.path.join(version_dir, 'scales.npy'), self.scales)
+        meta = {'index_name': self.index_name, 'ids': self.ids, 'sources': self.sources}
+        with open(os.path.join(version_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+        tmp_path = os.path.join(path, 'current.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': version}, f)
+        os.replace(tmp_path, os.path.join(path, 'current.json'))
+
+        for name in os.listdir(path):
+            if name.startswith('v') and name not in (version, previous):
+                shutil.rmtree(os.path.join(path, name), ignore_errors=True)
+
+    @classmethod
+    def load(cls, path):
+        version = current_version(path)
+        # 버전 디렉터리가 없던 이전 형식은 path에 파일이 바로 있음
+        data_dir = os.path.join(path, version) if version else path
+        vectors = np.load(os.path.join(data_dir, 'vectors.npy'), mmap_mode='r')
+        scales_path = os.path.join(data_dir, 'scales.npy')
+        scales = np.load(scales_path) if os.path.exists(scales_path) else None
+        with open(os.path.join(data_dir, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        index = cls(vectors, meta['ids'], meta['sources'], scales=scales, index_name=meta['index_name'])
+        index.version = version
+        return index
+
+    def cosine_scores(self, query_vector):
+        query = normalize(np.asarray(query_vector, dtype=np.float32).reshape(-1))
+        scores = np.empty(len(self.ids), dtype=np.float32)
+        for start in range(0, len(self.ids), BLOCK_ROWS):
+            block = np.asarray(self.vectors[start:start + BLOCK_ROWS], dtype=np.float32)
+            scores[start:start + len(block)] = block @ query
+        if self.scales is not None:
+            scores *= self.scales
+        return scores
+
+    def top_k(self, query_vector, k):
+        """(상위 k개 행 번호, 코사인 유사도)를 유사도 내림차순으로 반환합니다."""
+        scores = self.cosine_scores(query_vector)
+        k = min(k, len(scores))
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return top, scores[top]
+
+    def search(self, query_vector, k=10, source_fields=None, from_=0, size=None):
+        """
+        Elasticsearch kNN 응답과 같은 구조의 딕셔너리를 반환합니다. (_score는 ES cosine 규칙인 (1 + cos) / 2)
+        from_/size를 주면 상위 k개 중 해당 구간만 반환하고, total은 상위 k개 전체 개수입니다.
+        """
+        rows, cosines = self.top_k(query_vector, k)
+        total = len(rows)
+        end = None if size is None else from_ + size
+        hits = []
+        for row, cosine in zip(rows[from_:end], cosines[from_:end]):
+            source = self.sources[row]
+            if source_fields is not None:
+                source = {field: source[field] for field in source_fields if field in source}
+            hits.append({
+                "_index": self.index_name,
+                "_id": self.ids[row],
+                "_score": float((1.0 + cosine) / 2.0),
+                "_source": source
+            })
+        return {
+            "hits": {
+                "total": {"value": total, "relation": "eq"},
+                "max_score": hits[0]["_score"] if hits else None,
+                "hits": hits
+            }
+        }
+
+def exact_top_k(matrix, query_vector, k):
+    """정규화된 float32 행렬에 대한 정확한 코사인 검색 결과 (행 번호)"""
+    scores = normalize(matrix) @ normalize(np.asarray(query_vector, dtype=np.float32).reshape(-1))
+    return np.argsort(-scores, kind='stable')[:k]
+
+def recall_at_k(approx_rows, exact_rows):
+    exact = set(int(r) for r in exact_rows)
+    if not exact:
+        return 1.0
+    return len(exact.intersection(int(r) for r in approx_rows)) / len(exact)
+
+def check_parity(n=2700, dims=768, queries=50, k=10, seed=0):
+    """무작위 말뭉치에서 dtype별 recall@k를 정확한 코사인 검색과 비교합니다."""
+    rng = np.random.default_rng(seed)
+    # 실제 임베딩처럼 몇 개의 군집 주변에 분포하도록 생성
+    centers = rng.normal(size=(32, dims)).astype(np.float32)
+    matrix = centers[rng.integers(0, len(centers), size=n)] + 0.5 * rng.normal(size=(n, dims)).astype(np.float32)
+    query_vectors = centers[rng.integers(0, len(centers), size=queries)] + 0.5 * rng.normal(size=(queries, dims)).astype(np.float32)
+    records = [{'종목코드': f"{i:06}", 'text_vector': vector} for i, vector in enumerate(matrix)]
+
+    results = {}
+    for dtype in DTYPES:
+        index = LocalVectorIndex.build(records, dtype=dtype)
+        recalls = [recall_at_k(index.top_k(q, k)[0], exact_top_k(matrix, q, k)) for q in query_vectors]
+        results[dtype] = float(np.mean(recalls))
+    return results
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="로컬 벡터 색인 도구")
+    parser.add_argument('--check', action='store_true', help="dtype별 recall@k 패리티 검사 실행")
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--min-recall', type=float, default=0.95)
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.check:
+        results = check_parity(k=args.k)
+        for dtype, recall in results.items():
+            status = "✅" if recall >= args.min_recall else "❌"
+            print(f"{status} {dtype:<8} recall@{args.k} = {recall:.4f}")
+        if min(results.values()) < args.min_recall:
+            raise SystemExit(1)